@@ -0,0 +1,641 @@
+"""Small in-process caching primitives used in front of slow upstream calls.
+
+- :class:`TTLCache` – LRU cache with a size bound, a time-to-live and an
+  optional persistent second tier so entries survive restarts.
+- :class:`FileStore` / :class:`SQLiteStore` – pluggable persistent tiers
+  (one JSON file per key, or one row per key in a SQLite database).
+- :class:`SharedSQLiteStore` – a SQLite tier shared by the worker processes
+  of a host, with leases for cross-process single flight.
+- :class:`SingleFlight` – coalesces concurrent calls for the same key so only
+  one upstream request is in flight at a time.
+- :func:`content_key` – stable content hash for content-addressed entries.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Hashable, Protocol, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Sentinel returned by :meth:`TTLCache.get` on a miss (``None`` is a valid value).
+MISSING: Any = object()
+
+
+def content_key(*parts: Any) -> str:
+    """Return a stable SHA-256 hex digest of ``parts``.
+
+    Non-string parts are JSON encoded with sorted keys, so equal content always
+    maps to the same key regardless of dict ordering.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+@dataclass
+class CacheStats:
+    """Hit / miss counters of a cache."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    coalesced: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups that did not need their own upstream call."""
+        total = self.hits + self.coalesced + self.misses
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+class SingleFlight(Generic[T]):
+    """Run at most one ``loader`` per key at a time.
+
+    Concurrent callers for a key that is already loading await the same task
+    and receive its result (or exception).
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Task[T]] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, loader: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled caller doesn't cancel the load for the others.
+        return await asyncio.shield(task)
+
+
+# ---------------------------------------------------------------------------
+# Persistent stores
+# ---------------------------------------------------------------------------
+
+
+class PersistentStore(Protocol):
+    """Second cache tier holding JSON-compatible values with their timestamp.
+
+    The methods block; :class:`TTLCache` calls them through :meth:`run`, which
+    runs them off the event loop.
+    """
+
+    async def run(self, call: Callable[..., R], *args: Any) -> R: ...
+
+    def load(self, key: Hashable) -> tuple[float, Any] | None: ...
+
+    def save(self, key: Hashable, stored_at: float, value: Any) -> None: ...
+
+    def delete(self, key: Hashable) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class FileStore:
+    """One ``<sha256(key)>.json`` file per entry in ``directory``."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    async def run(self, call: Callable[..., R], *args: Any) -> R:
+        return await asyncio.to_thread(call, *args)
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha256(str(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def load(self, key: Hashable) -> tuple[float, Any] | None:
+        try:
+            with open(self._path(key), "r") as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        return record["stored_at"], record["value"]
+
+    def save(self, key: Hashable, stored_at: float, value: Any) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"stored_at": stored_at, "value": value}, f)
+        os.replace(tmp_path, path)
+
+    def delete(self, key: Hashable) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    """Whether `exc` means another connection holds the lock."""
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is None:
+        return "locked" in str(exc)
+    return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+class SQLiteStore:
+    """Entries stored as rows of a SQLite table.
+
+    When ``maxsize`` is set, the least recently accessed rows beyond it are
+    evicted on every write; access times of loaded rows are written along with
+    the next write instead of on every load.
+
+    The connection is only used from one worker thread (see :meth:`run`).
+    SQLite waits at most ``busy_timeout`` ms for a lock held by another
+    connection; :meth:`run` then retries without blocking the event loop,
+    for up to ``lock_timeout`` seconds.
+    """
+
+    busy_timeout = 50
+    lock_timeout = 5.0
+
+    def __init__(self, path: str, *, table: str = "cache", maxsize: int | None = None) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Invalid table name: {table!r}")
+        self.path = path
+        self.table = table
+        self.maxsize = maxsize
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sqlite-{table}")
+        # key → access time not yet written (see `load`)
+        self._accessed: dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # WAL: readers don't block the writer (nor each other).
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)}")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY,"
+            " stored_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " value TEXT NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    async def run(self, call: Callable[..., R], *args: Any) -> R:
+        """Run `call` on the connection's thread, retrying while the database is locked."""
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.01
+        while True:
+            try:
+                return await loop.run_in_executor(self._executor, call, *args)
+            except sqlite3.OperationalError as exc:
+                if not _is_busy(exc) or time.monotonic() > deadline:
+                    raise
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, 0.25)
+
+    def load(self, key: Hashable) -> tuple[float, Any] | None:
+        row = self._conn.execute(
+            f"SELECT stored_at, value FROM {self.table} WHERE key = ?", (str(key),)
+        ).fetchone()
+        if row is None:
+            return None
+        self._accessed[str(key)] = time.time()
+        return row[0], json.loads(row[1])
+
+    def save(self, key: Hashable, stored_at: float, value: Any) -> None:
+        if self._accessed:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, k) for k, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, stored_at, accessed_at, value) VALUES (?, ?, ?, ?)",
+            (str(key), stored_at, stored_at, json.dumps(value, ensure_ascii=False)),
+        )
+        if self.maxsize is not None:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f" SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def delete(self, key: Hashable) -> None:
+        self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (str(key),))
+
+    def clear(self) -> None:
+        self._conn.execute(f"DELETE FROM {self.table}")
+
+
+class SharedSQLiteStore(SQLiteStore):
+    """:class:`SQLiteStore` shared by several processes (uvicorn workers).
+
+    A :class:`TTLCache` on top of it checks that its in-memory copy of an entry
+    is still the stored one before using it – at most every
+    ``revalidate_after`` seconds per entry – so a ``set`` / ``invalidate`` in
+    one worker is seen by all of them within that time. Rows of the ``<table>_leases`` table
+    give one process at a time the right to compute a missing entry (see
+    :meth:`TTLCache.lease`); a lease expires after ``lease_ttl`` seconds in
+    case its holder died.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        table: str = "cache",
+        maxsize: int | None = None,
+        lease_ttl: float = 120.0,
+        revalidate_after: float = 1.0,
+    ) -> None:
+        super().__init__(path, table=table, maxsize=maxsize)
+        self.lease_ttl = lease_ttl
+        self.revalidate_after = revalidate_after
+        self._leases = f"{table}_leases"
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self._leases} ("
+            " key TEXT PRIMARY KEY,"
+            " token TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+
+    def stored_at(self, key: Hashable) -> float | None:
+        """Timestamp of the stored entry (``None`` when there is none)."""
+        row = self._conn.execute(
+            f"SELECT stored_at FROM {self.table} WHERE key = ?", (str(key),)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def acquire(self, key: Hashable) -> str | None:
+        """Take the lease on `key`; returns its token, or ``None`` when held."""
+        token = uuid.uuid4().hex
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                f"DELETE FROM {self._leases} WHERE key = ? AND expires_at < ?", (str(key), now)
+            )
+            cursor = self._conn.execute(
+                f"INSERT OR IGNORE INTO {self._leases} (key, token, expires_at) VALUES (?, ?, ?)",
+                (str(key), token, now + self.lease_ttl),
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return token if cursor.rowcount == 1 else None
+
+    def release(self, key: Hashable, token: str) -> None:
+        self._conn.execute(f"DELETE FROM {self._leases} WHERE key = ? AND token = ?", (str(key), token))
+
+
+def make_store(
+    kind: str | None,
+    path: str | None,
+    *,
+    table: str = "cache",
+    maxsize: int | None = None,
+) -> PersistentStore | None:
+    """Build a persistent store from configuration values.
+
+    ``kind`` is ``"file"`` (``path`` is a directory), ``"sqlite"`` (``path``
+    is a database file), ``"shared"`` (a :class:`SharedSQLiteStore` database
+    file) or ``"memory"`` for no persistent tier. ``None`` means ``"shared"``
+    at ``SHARED_CACHE_PATH`` when that is set, else ``"memory"`` – so one
+    variable makes every cache shared between the workers of a host.
+    """
+    if not kind and os.getenv("SHARED_CACHE_PATH"):
+        kind, path = "shared", os.getenv("SHARED_CACHE_PATH")
+    if not kind or kind == "memory":
+        return None
+    if not path:
+        raise ValueError(f"A path is required for the {kind!r} cache store")
+    if kind == "file":
+        return FileStore(path)
+    if kind == "sqlite":
+        return SQLiteStore(path, table=table, maxsize=maxsize)
+    if kind == "shared":
+        return SharedSQLiteStore(
+            path,
+            table=table,
+            maxsize=maxsize,
+            lease_ttl=float(os.getenv("CACHE_LEASE_TTL", "120")),
+            revalidate_after=float(os.getenv("CACHE_REVALIDATE_AFTER", "1")),
+        )
+    raise ValueError(f"Unknown cache store: {kind!r}")
+
+
+# ---------------------------------------------------------------------------
+# TTL / LRU cache
+# ---------------------------------------------------------------------------
+
+
+async def _released() -> None:
+    """``release`` of a claim that was given back already."""
+
+
+class TTLCache(Generic[T]):
+    """LRU cache with max size, TTL and an optional persistent tier.
+
+    Parameters
+    ----------
+    maxsize:
+        Maximum number of in-memory entries; the least recently used entry is
+        evicted first.
+    ttl:
+        Seconds an entry stays valid (``None`` / ``0`` = no expiry).
+    store:
+        Optional :class:`PersistentStore` written on every ``set`` and read
+        back on an in-memory miss; its calls run off the event loop. With a
+        shared store (see :class:`SharedSQLiteStore`) in-memory entries are
+        only used while they are still the stored ones, and loads are
+        single-flight across processes.
+    persist_dir:
+        Shortcut for ``store=FileStore(persist_dir)``.
+    serialize / deserialize:
+        Convert values to / from JSON-compatible data for the persistent tier.
+    """
+
+    def __init__(
+        self,
+        *,
+        maxsize: int = 128,
+        ttl: float | None = None,
+        store: PersistentStore | None = None,
+        persist_dir: str | None = None,
+        serialize: Callable[[T], Any] = lambda v: v,
+        deserialize: Callable[[Any], T] = lambda v: v,
+        name: str = "cache",
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl or None
+        self.name = name
+        self.stats = CacheStats()
+        self.store = store if store is not None else (FileStore(persist_dir) if persist_dir else None)
+        self._serialize = serialize
+        self._deserialize = deserialize
+        # key → (stored_at, value, time.monotonic() it was last known to be the stored one)
+        self._entries: OrderedDict[Hashable, tuple[float, T, float]] = OrderedDict()
+        self._singleflight: SingleFlight[T] = SingleFlight()
+        self._shared = getattr(self.store, "shared", False)
+        # key → lock of the coroutine computing it (see `lease`)
+        self._locks: weakref.WeakValueDictionary[Hashable, asyncio.Lock] = weakref.WeakValueDictionary()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # -- helpers -------------------------------------------------------------
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _store(self, key: Hashable, stored_at: float, value: T) -> None:
+        self._entries[key] = (stored_at, value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def _load_persisted(self, key: Hashable) -> Any:
+        store = self.store
+        try:
+            record = await store.run(store.load, key)  # type: ignore[union-attr]
+            if record is None:
+                return MISSING
+            stored_at, raw = record
+            if self._expired(stored_at):
+                self.stats.expirations += 1
+                await store.run(store.delete, key)  # type: ignore[union-attr]
+                return MISSING
+            value = self._deserialize(raw)
+        except Exception as exc:  # corrupt / incompatible entry – treat as miss
+            logger.warning("Ignoring unreadable %s entry for %r (%s)", self.name, key, exc)
+            return MISSING
+        self._store(key, stored_at, value)
+        return value
+
+    async def _still_stored(self, key: Hashable, stored_at: float) -> bool:
+        """Whether another process has not replaced or dropped the entry."""
+        store = self.store
+        try:
+            return await store.run(store.stored_at, key) == stored_at  # type: ignore[union-attr]
+        except sqlite3.Error as exc:
+            logger.warning("Could not check the %s entry for %r (%s)", self.name, key, exc)
+            return True
+
+    async def _lookup(self, key: Hashable) -> T:
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, value, checked_at = entry
+            if self._expired(stored_at):
+                del self._entries[key]
+                self.stats.expirations += 1
+            elif not self._shared or time.monotonic() - checked_at <= self.store.revalidate_after:  # type: ignore[union-attr]
+                self._entries.move_to_end(key)
+                return value
+            elif await self._still_stored(key, stored_at):
+                if self._entries.get(key) is entry:
+                    self._store(key, stored_at, value)
+                return value
+            elif self._entries.get(key) is entry:
+                del self._entries[key]
+        if self.store is not None:
+            return await self._load_persisted(key)
+        return MISSING
+
+    # -- public API ------------------------------------------------------------
+
+    async def get(self, key: Hashable) -> T:
+        """Return the cached value or :data:`MISSING` (updates hit/miss counters)."""
+        value = await self._lookup(key)
+        if value is MISSING:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value
+
+    async def peek(self, key: Hashable) -> T:
+        """Like :meth:`get`, without counting a hit or miss."""
+        return await self._lookup(key)
+
+    async def set(self, key: Hashable, value: T) -> None:
+        stored_at = time.time()
+        self._store(key, stored_at, value)
+        if self.store is not None:
+            try:
+                await self.store.run(self.store.save, key, stored_at, self._serialize(value))
+            except Exception as exc:
+                logger.warning("Failed to persist %s entry for %r (%s)", self.name, key, exc)
+
+    async def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+        if self.store is not None:
+            await self.store.run(self.store.delete, key)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        if self.store is not None:
+            await self.store.run(self.store.clear)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[T]],
+        *,
+        should_cache: Callable[[T], bool] = lambda _: True,
+    ) -> T:
+        """Return the cached value, or load it once for all concurrent callers.
+
+        Only results for which ``should_cache`` returns ``True`` are stored
+        (e.g. to avoid caching "not found" or error results).
+        """
+        value = await self._lookup(key)
+        if value is not MISSING:
+            self.stats.hits += 1
+            return value
+        if key in self._singleflight:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+
+        async def load() -> T:
+            value, release = await self._claim(key)
+            if value is not MISSING:
+                return value
+            try:
+                result = await loader()
+                if should_cache(result):
+                    await self.set(key, result)
+                return result
+            finally:
+                await release()
+
+        return await self._singleflight.do(key, load)
+
+    @asynccontextmanager
+    async def lease(self, key: Hashable) -> AsyncIterator[T]:
+        """Get `key`, or the exclusive right to compute it.
+
+        Yields the cached value, or :data:`MISSING` when the caller is expected
+        to compute the value and :meth:`set` it before leaving the block. Until
+        then other callers for `key` – in this process, and in other processes
+        of a shared store – wait and get the value once it's set. Only the
+        computation holds the claim: callers given a value don't block each
+        other while they use it. For loads that can't be wrapped in a single
+        ``loader`` (e.g. streamed LLM output); otherwise use :meth:`get_or_load`.
+        """
+        value = await self._lookup(key)
+        if value is not MISSING:
+            self.stats.hits += 1
+            yield value
+            return
+        value, release = await self._claim(key)
+        if value is not MISSING:
+            self.stats.coalesced += 1
+            yield value
+            return
+        self.stats.misses += 1
+        try:
+            yield MISSING
+        finally:
+            await release()
+
+    async def _claim(self, key: Hashable) -> tuple[T, Callable[[], Awaitable[None]]]:
+        """Wait for other holders of `key`, then return ``(value, release)``.
+
+        `value` is the one stored by a previous holder, the claim already
+        released; or :data:`MISSING`, and the caller holds the (local and, for
+        a shared store, cross-process) claim until it awaits ``release()``.
+        """
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        waited = lock.locked()
+        await lock.acquire()
+        token = None
+        try:
+            # Whoever held the claim before has probably stored the value.
+            value = await self._lookup(key) if waited else MISSING
+            if value is MISSING and self._shared:
+                value, token = await self._acquire_lease(key)
+        except BaseException:
+            lock.release()
+            raise
+        if value is not MISSING:
+            lock.release()
+            return value, _released
+
+        async def release() -> None:
+            try:
+                if token is not None:
+                    await self.store.run(self.store.release, key, token)  # type: ignore[union-attr]
+            finally:
+                lock.release()
+
+        return MISSING, release
+
+    async def _acquire_lease(self, key: Hashable) -> tuple[T, str | None]:
+        """Poll until this process holds the lease on `key` – ``(MISSING, token)``
+        – or another one stored the value – ``(value, None)``."""
+        store: SharedSQLiteStore = self.store  # type: ignore[assignment]
+        delay = 0.05
+        while True:
+            token = await store.run(store.acquire, key)
+            if token is not None:
+                # The previous holder may have stored it right before releasing.
+                value = await self._lookup(key)
+                if value is MISSING:
+                    return MISSING, token
+                await store.run(store.release, key, token)
+                return value, None
+            await asyncio.sleep(delay)
+            delay = min(2 * delay, 0.5)
+            value = await self._lookup(key)
+            if value is not MISSING:
+                return value, None
+
+
+__all__ = [
+    "MISSING",
+    "CacheStats",
+    "SingleFlight",
+    "PersistentStore",
+    "FileStore",
+    "SQLiteStore",
+    "SharedSQLiteStore",
+    "make_store",
+    "TTLCache",
+    "content_key",
+]
@@ -0,0 +1,223 @@
+"""Deterministic extraction of project links and technologies.
+
+The projects LLM only writes a title and a description per project; the
+other :class:`~.schemas.project_dict.ProjectDict` fields are filled in here
+from the candidate items of the prompt excerpt
+(:func:`~.projection.project_profile_for_projects`):
+
+- URLs in the description (and a publication's ``url``) are classified by
+  host / extension into ``images``, ``sourceUrl``, ``demoVideoUrl`` and
+  ``liveDemoUrl``,
+- ``technologies`` are the terms of :data:`TECHNOLOGIES` mentioned in the
+  title or description, in order of first mention.
+
+Each LLM project names its candidate in ``source`` (the ``id`` of the
+excerpt item); :func:`with_project_facts` replaces it with that candidate's
+facts.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any
+from urllib.parse import urlsplit
+
+# http(s) URLs, allowing balanced parentheses in the path (".../Demo%20(1).mp4")
+# but stopping at the ")" closing a markdown link.
+_URL_RE = re.compile(r"""https?://(?:[^\s()<>\[\]"'`]|\([^\s()<>]*\))+""")
+_URL_TRAILING = ".,;:!?*_"
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".webm")
+SOURCE_HOSTS = ("github.com", "gitlab.com", "bitbucket.org")
+VIDEO_HOSTS = ("youtube.com", "youtu.be", "vimeo.com", "loom.com")
+LIVE_DEMO_HOSTS = ("netlify.app", "vercel.app", "pages.dev", "workers.dev", "herokuapp.com", "streamlit.app")
+
+# Canonical (lowercase) technology name → spellings matched case-insensitively.
+TECHNOLOGIES: dict[str, tuple[str, ...]] = {
+    "python": ("python",),
+    "typescript": ("typescript",),
+    "javascript": ("javascript",),
+    "java": ("java",),
+    "kotlin": ("kotlin",),
+    "c#": ("c#",),
+    "c++": ("c++",),
+    ".net": (".net", "dotnet"),
+    "golang": ("golang",),
+    "scala": ("scala",),
+    "php": ("php",),
+    "ruby": ("ruby",),
+    "rails": ("ruby on rails", "rails"),
+    "apex": ("apex",),
+    "soql": ("soql",),
+    "sql": ("sql",),
+    "postgresql": ("postgresql", "postgres"),
+    "mysql": ("mysql",),
+    "mongodb": ("mongodb",),
+    "redis": ("redis",),
+    "sqlite": ("sqlite",),
+    "graphql": ("graphql",),
+    "node.js": ("node.js", "nodejs"),
+    "next.js": ("next.js", "nextjs"),
+    "vue": ("vue.js", "vuejs", "vue"),
+    "angular": ("angular",),
+    "svelte": ("svelte",),
+    "tailwind": ("tailwindcss", "tailwind"),
+    "html": ("html", "html5"),
+    "css": ("css", "css3"),
+    "django": ("django",),
+    "fastapi": ("fastapi",),
+    "spring boot": ("spring boot",),
+    "lwc": ("lightning web components", "lwc"),
+    "salesforce": ("salesforce",),
+    "agentforce": ("agentforce",),
+    "mulesoft": ("mulesoft",),
+    "heroku": ("heroku",),
+    "aws": ("aws", "amazon web services"),
+    "gcp": ("gcp", "google cloud"),
+    "azure": ("azure",),
+    "docker": ("docker",),
+    "kubernetes": ("kubernetes", "k8s"),
+    "terraform": ("terraform",),
+    "supabase": ("supabase",),
+    "firebase": ("firebase",),
+    "openai": ("openai", "gpt-4o", "gpt-4", "chatgpt"),
+    "langchain": ("langchain",),
+    "langgraph": ("langgraph",),
+    "llm": ("llms", "llm"),
+    "mcp": ("model context protocol", "mcp"),
+    "pytorch": ("pytorch",),
+    "tensorflow": ("tensorflow",),
+    "pandas": ("pandas",),
+    "kafka": ("kafka",),
+    "git": ("git",),
+}
+
+# English words that are technologies only when capitalised ("React", not "react to").
+CASED_TECHNOLOGIES: dict[str, tuple[str, ...]] = {
+    "react": ("React", "React.js", "ReactJS"),
+    "react native": ("React Native",),
+    "rust": ("Rust",),
+    "swift": ("Swift",),
+    "flask": ("Flask",),
+    "express": ("Express.js", "Express"),
+    "flutter": ("Flutter",),
+}
+
+
+def _terms_pattern(terms: dict[str, tuple[str, ...]], flags: int) -> tuple[re.Pattern[str], dict[str, str]]:
+    """One alternation of all spellings (longest first) and spelling → name."""
+    names = {spelling.lower() if flags & re.I else spelling: name for name, spellings in terms.items() for spelling in spellings}
+    alternation = "|".join(re.escape(spelling) for spelling in sorted(names, key=len, reverse=True))
+    # Not part of a longer word or dotted name ("javascript" for "java", "asp.net" for ".net").
+    return re.compile(rf"(?<![\w.+#])(?:{alternation})(?![\w+#]|\.\w)", flags), names
+
+
+_TECH_RE, _TECH_NAMES = _terms_pattern(TECHNOLOGIES, re.I)
+_CASED_TECH_RE, _CASED_TECH_NAMES = _terms_pattern(CASED_TECHNOLOGIES, 0)
+
+
+def find_urls(text: str | None) -> list[str]:
+    """http(s) URLs in `text`, in order, without trailing punctuation."""
+    if not text:
+        return []
+    return [match.group(0).rstrip(_URL_TRAILING) for match in _URL_RE.finditer(text)]
+
+
+def find_technologies(*texts: str | None) -> list[str]:
+    """Canonical names of the technologies mentioned in `texts`, in order of first mention.
+
+    URLs are skipped: a repository named ``agent-creator-mcp`` says little
+    about the stack.
+    """
+    text = _URL_RE.sub(" ", "\n".join(t for t in texts if t))
+    found: dict[str, int] = {}
+    for match in _TECH_RE.finditer(text):
+        found.setdefault(_TECH_NAMES[match.group(0).lower()], match.start())
+    for match in _CASED_TECH_RE.finditer(text):
+        found.setdefault(_CASED_TECH_NAMES[match.group(0)], match.start())
+    return sorted(found, key=found.__getitem__)
+
+
+def _host_matches(host: str, domains: tuple[str, ...]) -> bool:
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+def classify_url(url: str) -> str | None:
+    """The :class:`ProjectDict` field a URL belongs to, or None."""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    path = parts.path.lower()
+    if path.endswith(IMAGE_EXTENSIONS):
+        return "images"
+    if _host_matches(host, SOURCE_HOSTS):
+        return "sourceUrl"
+    if path.endswith(VIDEO_EXTENSIONS) or _host_matches(host, VIDEO_HOSTS):
+        return "demoVideoUrl"
+    if _host_matches(host, LIVE_DEMO_HOSTS) or host.endswith(".app"):
+        return "liveDemoUrl"
+    return None
+
+
+def project_facts(item: dict[str, Any]) -> dict[str, Any]:
+    """Links and technologies of one excerpt item (project, publication or position).
+
+    Only non-empty fields are set; the first URL of each single-URL field wins.
+    """
+    title = item.get("title") or item.get("name")
+    description = item.get("description")
+    facts: dict[str, Any] = {}
+    technologies = find_technologies(title, description)
+    if technologies:
+        facts["technologies"] = technologies
+    urls = find_urls(description)
+    if item.get("url"):
+        urls.append(item["url"])
+    for url in urls:
+        field = classify_url(url)
+        if field == "images":
+            if url not in facts.setdefault("images", []):
+                facts["images"].append(url)
+        elif field is not None:
+            facts.setdefault(field, url)
+    return facts
+
+
+def extract_project_facts(excerpt: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """Facts of every candidate of a projects prompt excerpt, keyed by its ``id``."""
+    return {
+        item["id"]: project_facts(item)
+        for section in ("projects", "publications", "positions")
+        for item in excerpt.get(section, [])
+    }
+
+
+def with_project_facts(answer: Any, facts: dict[str, dict[str, Any]]) -> Any:
+    """`answer` (a possibly partial LLM answer) with each project's ``source``
+    replaced by the extracted facts of that candidate.
+
+    Returns new dicts: partial answers may be reused by the model client and
+    the ones already streamed must not change.
+    """
+    if not isinstance(answer, dict) or not isinstance(answer.get("projects"), list):
+        return answer
+    projects = []
+    for project in answer["projects"]:
+        if not isinstance(project, dict):
+            continue
+        merged = {key: value for key, value in project.items() if key != "source"}
+        merged.update(facts.get(project.get("source"), {}))
+        projects.append(merged)
+    return {**answer, "projects": projects}
+
+
+__all__ = [
+    "TECHNOLOGIES",
+    "CASED_TECHNOLOGIES",
+    "find_urls",
+    "find_technologies",
+    "classify_url",
+    "project_facts",
+    "extract_project_facts",
+    "with_project_facts",
+]
@@ -0,0 +1,99 @@
+"""Application-scoped, pooled aiohttp client.
+
+One :class:`aiohttp.ClientSession` (and connection pool) is shared by all
+graph runs so upstream calls reuse DNS results and keep-alive TCP/TLS
+connections instead of paying a fresh handshake per request.
+
+The FastAPI lifespan calls :meth:`HttpClientPool.start` / :meth:`HttpClientPool.close`;
+outside of FastAPI (e.g. ``langgraph dev``) the session is created lazily on
+first use.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+
+import aiohttp
+
+
+class HttpClientPool:
+    """Lazily created, long-lived :class:`aiohttp.ClientSession`.
+
+    Parameters
+    ----------
+    limit:
+        Maximum number of simultaneous connections (all hosts).
+    limit_per_host:
+        Maximum number of simultaneous connections to one host.
+    timeout:
+        Total timeout in seconds for a single request.
+    connect_timeout:
+        Timeout in seconds for acquiring a connection (incl. handshake).
+    keepalive_timeout:
+        Seconds an idle connection is kept open for reuse.
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        timeout: float = 30.0,
+        connect_timeout: float = 10.0,
+        keepalive_timeout: float = 60.0,
+    ) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self._session: aiohttp.ClientSession | None = None
+        self._lock: asyncio.Lock | None = None
+
+    @classmethod
+    def from_env(cls) -> "HttpClientPool":
+        return cls(
+            limit=int(os.getenv("HTTP_POOL_LIMIT", "100")),
+            limit_per_host=int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "20")),
+            timeout=float(os.getenv("HTTP_TIMEOUT", "30")),
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")),
+            keepalive_timeout=float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60")),
+        )
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None and not self._session.closed
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def start(self) -> None:
+        if not self.started:
+            self._session = self._create_session()
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use."""
+        if self.started:
+            return self._session  # type: ignore[return-value]
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self.start()
+        return self._session  # type: ignore[return-value]
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+# Shared by all graph runs in this process.
+HTTP_POOL = HttpClientPool.from_env()
+
+__all__ = ["HttpClientPool", "HTTP_POOL"]
@@ -0,0 +1,243 @@
+"""Concurrency limits, admission control and retries for upstream calls.
+
+- :class:`Limiter` – bounded concurrency with an optional bounded wait queue
+  and maximum wait; callers that can't get a slot in time are rejected with
+  :class:`AdmissionRejected` (carrying a ``retry_after`` hint).
+- :func:`retry_async` – retries :class:`UpstreamRateLimited` failures with
+  jittered exponential backoff, honouring the upstream ``Retry-After``.
+
+The limiters of the app are configured from the environment at the bottom of
+this module.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import random
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Iterable, TypeVar
+
+from .metrics import REGISTRY, UPSTREAM_RETRIES, Sample
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+    """No slot became free in time; retry after ``retry_after`` seconds."""
+
+    def __init__(self, limiter: str, retry_after: float) -> None:
+        super().__init__(f"{limiter} is at capacity, retry after {retry_after:.0f}s")
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+
+class UpstreamRateLimited(Exception):
+    """An upstream answered 429 / 503, optionally with a ``Retry-After``."""
+
+    def __init__(self, upstream: str, status: int, retry_after: float | None = None) -> None:
+        super().__init__(f"{upstream} answered {status}")
+        self.upstream = upstream
+        self.status = status
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds from a ``Retry-After`` header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class Ticket:
+    """A held :class:`Limiter` slot; :meth:`release` is idempotent.
+
+    Holders must release it explicitly (``try`` / ``finally``, or
+    :meth:`Limiter.slot`): a lost ticket keeps its slot.
+    """
+
+    __slots__ = ("_limiter", "released")
+
+    def __init__(self, limiter: "Limiter") -> None:
+        self._limiter = limiter
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self._limiter._release()
+
+
+class Limiter:
+    """At most ``limit`` concurrent holders.
+
+    Parameters
+    ----------
+    limit:
+        Number of slots.
+    max_queue:
+        Callers allowed to wait for a slot (``None`` = unbounded); beyond it,
+        :meth:`acquire` is rejected immediately.
+    max_wait:
+        Seconds a caller may wait for a slot (``None`` = forever).
+    retry_after:
+        ``Retry-After`` hint given to rejected callers (defaults to
+        ``max_wait``, or 1 s).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        *,
+        max_queue: int | None = None,
+        max_wait: float | None = None,
+        retry_after: float | None = None,
+    ) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.retry_after = retry_after if retry_after is not None else (max_wait or 1.0)
+        self.in_use = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def _reject(self) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(self.name, self.retry_after)
+
+    async def acquire(self, *, patient: bool = False) -> Ticket:
+        """Wait for a slot; raises :class:`AdmissionRejected` when full.
+
+        `patient` callers (background work that nobody is waiting on) wait
+        for a slot however long it takes instead of ``max_wait``; they are
+        still rejected when the queue is full.
+        """
+        if self._semaphore.locked() and self.max_queue is not None and self.waiting >= self.max_queue:
+            raise self._reject()
+        self.waiting += 1
+        try:
+            if self.max_wait is None or patient:
+                await self._semaphore.acquire()
+            else:
+                await asyncio.wait_for(self._semaphore.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            raise self._reject() from None
+        finally:
+            self.waiting -= 1
+        self.in_use += 1
+        return Ticket(self)
+
+    def _release(self) -> None:
+        self.in_use -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self, *, patient: bool = False) -> AsyncIterator[Ticket]:
+        ticket = await self.acquire(patient=patient)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+
+async def retry_async(
+    call: Callable[[], Awaitable[T]],
+    *,
+    attempts: int,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+) -> T:
+    """Run `call`, retrying :class:`UpstreamRateLimited` up to `attempts` times.
+
+    The n-th retry waits a random ``[0, min(max_delay, base_delay * 2**n)]``
+    ("full jitter"), or the upstream's ``Retry-After`` plus up to
+    ``base_delay`` of jitter when that is longer.
+    """
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except UpstreamRateLimited as exc:
+            if attempt + 1 >= attempts:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+            if exc.retry_after is not None:
+                delay = max(delay, min(exc.retry_after, max_delay) + random.uniform(0, base_delay))
+            UPSTREAM_RETRIES.labels(exc.upstream).inc()
+            logger.info("%s (attempt %d/%d), retrying in %.2fs", exc, attempt + 1, attempts, delay)
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+# Concurrent ProAPIS profile requests / OpenAI projects calls per process.
+PROAPIS_LIMITER = Limiter("proapis", _env_int("PROAPIS_CONCURRENCY", 8))
+LLM_LIMITER = Limiter("llm", _env_int("LLM_CONCURRENCY", 4))
+
+# Graph runs admitted at once for /api/portfolio*; further requests wait up
+# to ADMISSION_MAX_WAIT seconds in a queue of ADMISSION_QUEUE, else get a 503.
+ADMISSION = Limiter(
+    "admission",
+    _env_int("ADMISSION_LIMIT", 16),
+    max_queue=_env_int("ADMISSION_QUEUE", 64),
+    max_wait=_env_float("ADMISSION_MAX_WAIT", 10.0),
+)
+
+# Retries of upstream 429 / 503 answers.
+UPSTREAM_ATTEMPTS = _env_int("UPSTREAM_RETRIES", 3) + 1
+UPSTREAM_RETRY_BASE = _env_float("UPSTREAM_RETRY_BASE", 0.5)
+UPSTREAM_RETRY_MAX = _env_float("UPSTREAM_RETRY_MAX", 8.0)
+
+LIMITERS = (PROAPIS_LIMITER, LLM_LIMITER, ADMISSION)
+
+
+def _limiter_samples(attribute: str, metric: str) -> Callable[[], Iterable[Sample]]:
+    def collect() -> Iterable[Sample]:
+        for limiter in LIMITERS:
+            yield metric, {"limiter": limiter.name}, getattr(limiter, attribute)
+
+    return collect
+
+
+REGISTRY.add_collector("portfolio_limiter_in_use", "gauge", "Limiter slots in use.", _limiter_samples("in_use", "portfolio_limiter_in_use"))
+REGISTRY.add_collector("portfolio_limiter_waiting", "gauge", "Callers waiting for a limiter slot.", _limiter_samples("waiting", "portfolio_limiter_waiting"))
+REGISTRY.add_collector("portfolio_limiter_rejected_total", "counter", "Callers rejected by a limiter.", _limiter_samples("rejected", "portfolio_limiter_rejected_total"))
+
+__all__ = [
+    "AdmissionRejected",
+    "UpstreamRateLimited",
+    "parse_retry_after",
+    "Ticket",
+    "Limiter",
+    "retry_async",
+    "PROAPIS_LIMITER",
+    "LLM_LIMITER",
+    "ADMISSION",
+    "UPSTREAM_ATTEMPTS",
+    "UPSTREAM_RETRY_BASE",
+    "UPSTREAM_RETRY_MAX",
+]
@@ -0,0 +1,334 @@
+"""Minimal Prometheus-style metrics (counters, gauges, histograms).
+
+A small in-process implementation of the Prometheus text exposition format,
+so the app can expose ``/metrics`` without an extra dependency. Recording a
+value is a dict lookup plus an addition (and a ``bisect`` for histograms), so
+instrumentation can sit on the streaming hot path.
+
+The metrics of the app are defined at the bottom of this module and rendered
+by :data:`REGISTRY`.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+# Sample as (metric name, labels, value), produced by collectors at scrape time.
+Sample = tuple[str, dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: str, **labels: str) -> Any:
+        """The child metric for one combination of label values."""
+        key = values or tuple(labels[name] for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _label_dict(self, key: tuple[str, ...]) -> dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Monotonically increasing value (``inc`` only)."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, child in self._children.items():
+            yield self.name, self._label_dict(key), child.value
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative ``le`` buckets."""
+
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.bounds = tuple(sorted(float(b) for b in buckets if not math.isinf(b)))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, child in self._children.items():
+            labels = self._label_dict(key)
+            cumulative = 0
+            for bound, count in zip((*self.bounds, math.inf), child.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, child.count
+
+
+class MetricsRegistry:
+    """Metrics plus collectors rendered together in the text format."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        # (name, type, help, callback returning samples) evaluated per scrape
+        self._collectors: list[tuple[str, str, str, Callable[[], Iterable[Sample]]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, name: str, kind: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> None:
+        """Register samples computed at scrape time (e.g. cache statistics)."""
+        self._collectors.append((name, kind, documentation, collect))
+
+    def render(self) -> str:
+        blocks = [metric.render() for metric in self._metrics.values()]
+        for name, kind, documentation, collect in self._collectors:
+            lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+            lines += [f"{n}{_format_labels(labels)} {_format_value(v)}" for n, labels, v in collect()]
+            blocks.append("\n".join(lines))
+        return "\n".join(blocks) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+
+def gauge(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: Iterable[str] = (),
+    buckets: Iterable[float] = Histogram.DEFAULT_BUCKETS,
+) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+
+# ---------------------------------------------------------------------------
+# Metrics of the app
+# ---------------------------------------------------------------------------
+
+_SECONDS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+
+NODE_DURATION = histogram(
+    "portfolio_node_duration_seconds", "Wall time of a graph node run.", ["node"], _SECONDS
+)
+NODE_ERRORS = counter("portfolio_node_errors_total", "Graph node runs that raised.", ["node"])
+UPSTREAM_LATENCY = histogram(
+    "portfolio_upstream_latency_seconds",
+    "Upstream call latency (phase=total, or first_token for streamed LLM answers).",
+    ["upstream", "phase"],
+    _SECONDS,
+)
+UPSTREAM_RETRIES = counter(
+    "portfolio_upstream_retries_total", "Upstream calls retried after a 429 / 503.", ["upstream"]
+)
+STREAM_PACING = counter(
+    "portfolio_stream_pacing_seconds_total", "Time stream_state spent sleeping for pacing.", ["node"]
+)
+STREAM_FRAMES = histogram(
+    "portfolio_stream_frames",
+    "SSE frames written per streaming request.",
+    ["source"],
+    (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+STREAM_BYTES = histogram(
+    "portfolio_stream_bytes",
+    "SSE bytes written per streaming request (after compression).",
+    ["source"],
+    (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6, 1e7),
+)
+STREAM_DURATION = histogram(
+    "portfolio_stream_duration_seconds", "Duration of a streaming request.", ["source"], _SECONDS
+)
+PROMPT_TOKENS = histogram(
+    "portfolio_prompt_tokens",
+    "Input tokens of a profile excerpt sent to the LLM (after budgeting).",
+    ["prompt"],
+    (250, 500, 1000, 2000, 4000, 8000, 16000, 32000),
+)
+PROMPT_TOKENS_CUT = counter(
+    "portfolio_prompt_tokens_cut_total", "Excerpt tokens cut to fit the prompt token budget.", ["prompt"]
+)
+ACTIVE_STREAMS = gauge("portfolio_active_streams", "SSE responses currently being written.")
+STARTUP_SECONDS = gauge(
+    "portfolio_startup_seconds", "Time spent in a startup phase (import, lifespan, warm_up).", ["phase"]
+)
+
+
+def register_cache_metrics(caches: dict[str, Any]) -> None:
+    """Expose the :class:`~.cache.CacheStats` of `caches` (name → TTLCache)."""
+
+    def requests() -> Iterable[Sample]:
+        for name, cache in caches.items():
+            for result in ("hits", "misses", "coalesced"):
+                yield "portfolio_cache_requests_total", {"cache": name, "result": result}, getattr(cache.stats, result)
+
+    def hit_ratio() -> Iterable[Sample]:
+        for name, cache in caches.items():
+            yield "portfolio_cache_hit_ratio", {"cache": name}, cache.stats.hit_rate
+
+    def entries() -> Iterable[Sample]:
+        for name, cache in caches.items():
+            yield "portfolio_cache_entries", {"cache": name}, len(cache)
+
+    REGISTRY.add_collector("portfolio_cache_requests_total", "counter", "Cache lookups by result.", requests)
+    REGISTRY.add_collector("portfolio_cache_hit_ratio", "gauge", "Share of lookups served without an upstream call.", hit_ratio)
+    REGISTRY.add_collector("portfolio_cache_entries", "gauge", "In-memory cache entries.", entries)
+
+
+def instrument_node(node: str) -> Callable[[F], F]:
+    """Record the duration (and failures) of an async graph node."""
+
+    def decorate(fn: F) -> F:
+        duration = NODE_DURATION.labels(node)
+        errors = NODE_ERRORS.labels(node)
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
+
+
+__all__ = [
+    "Sample",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "REGISTRY",
+    "NODE_DURATION",
+    "NODE_ERRORS",
+    "UPSTREAM_LATENCY",
+    "UPSTREAM_RETRIES",
+    "STREAM_PACING",
+    "STREAM_FRAMES",
+    "STREAM_BYTES",
+    "STREAM_DURATION",
+    "PROMPT_TOKENS",
+    "PROMPT_TOKENS_CUT",
+    "ACTIVE_STREAMS",
+    "STARTUP_SECONDS",
+    "register_cache_metrics",
+    "instrument_node",
+]
@@ -0,0 +1,128 @@
+"""Helpers for the *delta* streaming format.
+
+Instead of re-sending the whole snapshot after every mutation, the delta
+format emits a list of small operations addressed by RFC 6901 JSON pointers
+(relative to the section ``data`` object):
+
+- ``{"op": "add", "path": "/profile/summary", "value": ""}`` – RFC 6902 add
+  (``/-`` appends to an array).
+- ``{"op": "append", "path": "/profile/summary", "value": "abc"}`` – compact
+  extension that appends a suffix to an existing string.
+
+Full snapshots (``structured`` chunks) are still sent periodically as
+keyframes so a client can always resync.
+
+:func:`diff_ops` derives such operations from two versions of a document,
+for producers that only have successive snapshots (LLM structured output).
+"""
+
+from __future__ import annotations
+
+import copy
+from typing import Any
+
+from .schemas.custom_chunks import PatchOp
+
+
+def escape_token(token: Any) -> str:
+    """Escape a single JSON pointer reference token (RFC 6901)."""
+
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def join_pointer(base: str, token: Any) -> str:
+    """Return ``base`` extended by one (escaped) reference token."""
+
+    return f"{base}/{escape_token(token)}"
+
+
+def add_op(path: str, value: Any) -> PatchOp:
+    return {"op": "add", "path": path, "value": value}
+
+
+def append_op(path: str, value: str) -> PatchOp:
+    return {"op": "append", "path": path, "value": value}
+
+
+def unescape_token(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def apply_ops(doc: Any, ops: list[PatchOp]) -> Any:
+    """Apply `ops` to `doc` **in place** and return the (possibly new) root.
+
+    Mirrors ``applyPatch`` in ``frontend/src/lib/patch.ts``.
+    """
+    for op in ops:
+        tokens = [unescape_token(t) for t in op["path"].split("/")[1:]]
+        if not tokens:
+            doc = f"{doc or ''}{op['value']}" if op["op"] == "append" else op["value"]
+            continue
+        node = doc
+        for token in tokens[:-1]:
+            node = node[int(token)] if isinstance(node, list) else node[token]
+        last = tokens[-1]
+        if isinstance(node, list):
+            if last == "-":
+                node.append(op["value"])
+            elif op["op"] == "append":
+                node[int(last)] += op["value"]
+            else:
+                node.insert(int(last), op["value"])
+        elif op["op"] == "append":
+            node[last] = node.get(last, "") + op["value"]
+        else:
+            node[last] = op["value"]
+    return doc
+
+
+def _diff(old: Any, new: Any, path: str, ops: list[PatchOp]) -> bool:
+    """Append the ops turning `old` into `new` at `path` to `ops`.
+
+    Returns False (leaving `ops` untouched) when the change needs more than
+    ``add`` / ``append``: a removed key or item, a shortened string, a type
+    change or a changed array item (``add`` on an index inserts). The caller
+    then replaces the closest object member containing the change.
+    """
+    if old == new:
+        return True
+    if isinstance(old, str) and isinstance(new, str):
+        if not new.startswith(old):
+            return False
+        ops.append(append_op(path, new[len(old):]))
+        return True
+    start = len(ops)
+    if isinstance(old, dict) and isinstance(new, dict):
+        if not old.keys() <= new.keys():
+            return False
+        for key, value in new.items():
+            child_path = join_pointer(path, key)
+            if key not in old or not _diff(old[key], value, child_path, ops):
+                ops.append(add_op(child_path, copy.deepcopy(value)))
+        return True
+    if isinstance(old, list) and isinstance(new, list):
+        if len(new) < len(old):
+            return False
+        for index, value in enumerate(old):
+            if not _diff(value, new[index], join_pointer(path, index), ops):
+                del ops[start:]
+                return False
+        ops.extend(add_op(f"{path}/-", copy.deepcopy(value)) for value in new[len(old):])
+        return True
+    return False
+
+
+def diff_ops(old: Any, new: Any) -> list[PatchOp]:
+    """Operations that turn `old` into `new` (``apply_ops(old, ops) == new``).
+
+    Growing documents – new keys, appended items, extended strings – diff to
+    ``add`` / ``append`` ops of just the new parts; anything else falls back
+    to re-adding the smallest enclosing object member (or the root).
+    """
+    ops: list[PatchOp] = []
+    if not _diff(old, new, "", ops):
+        ops = [add_op("", copy.deepcopy(new))]
+    return ops
+
+
+__all__ = ["escape_token", "unescape_token", "join_pointer", "add_op", "append_op", "apply_ops", "diff_ops"]
@@ -1,16 +1,28 @@
 from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END, START
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from pydantic import BaseModel
 from langgraph.config import get_stream_writer
 from typing import TypedDict, NotRequired, Dict, Any, Literal
-from .tools import get_linkedin_data, stream_state
-from .schemas.linkedin_profile_models import PersonalProfileModel
+from .tools import get_linkedin_data, stream_state, reuses_sections, PartialStreamer, PROJECTS_CACHE, SECTION_CACHE
+from .cache import MISSING, content_key
+from .metrics import UPSTREAM_LATENCY, instrument_node
+from .limits import LLM_LIMITER, UPSTREAM_ATTEMPTS
+from .projection import project_profile_for_projects, projects_prompt_payload, section_fingerprint
+from .extraction import extract_project_facts, with_project_facts
+from .schemas import linkedin_profile_models
+from .schemas.linkedin_profile_models import PortfolioProfileModel
 from .schemas.about_dict import AboutSectionDict
-from .schemas.project_dict import ProjectDict, ProjectsSectionDict
+from .schemas.project_dict import ProjectDict, ProjectDraftsDict, ProjectsSectionDict
 from .schemas.experience_dict import ExperienceCompanyDict
-from .schemas.custom_chunks import StructuredChunk, NodeUpdate
+from .schemas.custom_chunks import NodeUpdate
 
+import asyncio
+import functools
 import logging
+import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -26,38 +38,93 @@ class OutputState(TypedDict):
 
 class OverallState(InputState, OutputState):
     """State for the agent graph."""
-    linkedin_data: NotRequired[PersonalProfileModel] | None
+    linkedin_data: NotRequired[PortfolioProfileModel] | None
 
 graph_builder = StateGraph(OverallState, input_schema=InputState, output_schema=OutputState)
 
+PROJECTS_MODEL = "gpt-4o-mini"
+# Input tokens of the profile excerpt in the projects prompt; larger profiles
+# are trimmed (see `fit_to_budget`) so the call's latency stays bounded.
+PROJECTS_PROMPT_TOKENS = int(os.getenv("PROJECTS_PROMPT_TOKENS", "6000"))
+
+
+@functools.cache
+def projects_model():
+    """The structured-output projects model, built once per process.
+
+    It only drafts titles and descriptions (:class:`ProjectDraftsDict`);
+    links and technologies are extracted deterministically.
+
+    ``langchain_openai`` (and ``openai``) take over a second to import, more
+    than the rest of the app together, so the import is deferred to the first
+    call instead of delaying every cold start.
+    """
+    from langchain_openai import ChatOpenAI
+
+    # The OpenAI client retries 429s itself, with jittered backoff honouring Retry-After.
+    model = ChatOpenAI(model=PROJECTS_MODEL, max_retries=UPSTREAM_ATTEMPTS - 1)
+    return model.with_structured_output(ProjectDraftsDict)
+
+
+def warm_up() -> None:
+    """Do the deferred imports now (see ``STARTUP_MODE`` in ``app.main``)."""
+    try:
+        projects_model()
+    except Exception as exc:  # e.g. no OPENAI_API_KEY: fail on first use instead
+        logging.getLogger(__name__).warning("Could not build the projects model: %s", exc)
+
 
     
+@instrument_node("linkedin_node")
 async def linkedin_node(state: OverallState):
     """Node for routing the user to the appropriate section."""
 
-    raw_data = await get_linkedin_data(state["linkedin_id"])
-    print("raw_data", raw_data)
-    # Parse into Pydantic model so downstream nodes can use attribute access
-    linkedin_data = PersonalProfileModel.model_validate(raw_data) if raw_data else None
+    # Already validated by `get_linkedin_data`; None when the profile doesn't exist
+    linkedin_data = await get_linkedin_data(state["linkedin_id"])
+    if isinstance(linkedin_data, Exception):
+        raise linkedin_data
     linkedin_status = "found" if linkedin_data else "not_found"
     return {
         "linkedin_data": linkedin_data,
         "linkedin_status": linkedin_status,
     }
 ""
-async def route_node(state: OverallState) -> Literal["about", "__end__"]:
-    """Node for routing the user to the appropriate section."""
+SECTION_NODES = ["about", "projects", "experience"]
+
+
+async def reused_section(node: str, fingerprint: str, *, delay: float) -> Any:
+    """Stream and return the stored section of `node` for `fingerprint`.
+
+    :data:`MISSING` when the section has to be computed: reuse is disabled
+    for this run, or the inputs changed since the section was stored.
+    """
+    if not reuses_sections():
+        return MISSING
+    section = await SECTION_CACHE.get(fingerprint)
+    if section is not MISSING:
+        await stream_state(node, section, delay=delay)
+        get_stream_writer()(NodeUpdate(current_node=node, data={"status": "completed", "reused": True}, chunk_type="node_update"))
+    return section
+
+
+async def route_node(state: OverallState) -> list[str] | Literal["__end__"]:
+    """Fan out to all section nodes (run concurrently) or end when the profile is missing."""
     linkedin_data = state["linkedin_data"]
     if linkedin_data is None:
         return "__end__"
     else:
-        return "about"
+        return SECTION_NODES
 
+@instrument_node("about_node")
 async def about_node(state: OverallState):
     """Extracts About section data from LinkedIn JSON."""
-    linkedin: PersonalProfileModel = state["linkedin_data"]
+    linkedin: PortfolioProfileModel = state["linkedin_data"]
     writer = get_stream_writer()
     writer(NodeUpdate(current_node="about_node", data={"status": "started"}, chunk_type="node_update"))
+    fingerprint = section_fingerprint("about_node", linkedin)
+    reused = await reused_section("about_node", fingerprint, delay=0.003)
+    if reused is not MISSING:
+        return {"about_data": reused}
     about_data: AboutSectionDict = {}
 
     # Build profile information using dot access
@@ -87,6 +154,7 @@ async def about_node(state: OverallState):
    
 
     await stream_state("about_node", about_data, delay=0.003)
+    await SECTION_CACHE.set(fingerprint, about_data)
 
     writer(NodeUpdate(current_node="about_node", data={"status": "completed"}, chunk_type="node_update"))
 
@@ -94,45 +162,37 @@ async def about_node(state: OverallState):
         "about_data": about_data,
     }
 
-async def projects_node(state: OverallState):
-    """Node for the projects section."""
-    writer = get_stream_writer()
-    writer(NodeUpdate(current_node="projects_node", data={"status": "started"}, chunk_type="node_update"))
-    linkedin: PersonalProfileModel = state["linkedin_data"]
-
-    system_content = """
+# System prompt of the projects call; part of the section fingerprint, so a
+# prompt change recomputes stored sections.
+PROJECTS_SYSTEM_PROMPT = """
     ROLE: Portfolio Project Extractor
-    You are a specialised assistant whose ONLY task is to extract a structured list of the user's projects from a LinkedIn PersonalProfile JSON document.
+    You are a specialised assistant whose ONLY task is to extract a structured list of the user's projects from a LinkedIn PersonalProfile JSON excerpt (keys "projects", "publications" and "positions"; dates are "YYYY-MM" strings; every item has an "id").
 
     OUTPUT REQUIREMENTS
     -------------------
     • Return VALID JSON only – no markdown, no additional keys, no prose.
     • The root object must have a single key "projects" whose value is an array of objects that conform to the schema below.
-    • If there are not values for the optional fields, do not include them in the JSON!
-    • Never use null for optional fields, use empty strings instead or dont show them at all.
     • Do not wrap the JSON in triple back-ticks.
+    • Links and technologies are extracted separately: do NOT output URLs or technology lists.
 
-    OUTPUT SCHEMA (Python `ProjectDict`)
-    ------------------------------------
+    OUTPUT SCHEMA (Python `ProjectDraftDict`)
+    -----------------------------------------
       {
+        "source": str,                     # required, the "id" of the item the project comes from
         "title": str,                      # required
-        "description": str,                # required, concise (≤120 words)
-        "technologies": List[str],         # optional, lowercase technology names
-        "images": List[str],               # optional, image URLs (.png .jpg .gif)
-        "demoVideoUrl": str,               # optional, video URL
-        "liveDemoUrl": str,               # optional, live demo URL
-        "sourceUrl": str                   # optional, repository URL
+        "description": str                 # required, concise (≤70 words)
       }
 
     EXTRACTION GUIDELINES
     ---------------------
     1. Inspect profile["projects"] first. If it is absent, continue processing.
     2. Supplement with relevant items from profile["publications"] when they represent tangible projects.
-    3. Also read through the job history and if they mention any projects they worked on use those as well:
+    3. Also read through the job history (profile["positions"]) and if they mention any projects they worked on use those as well:
         a. Don't use their job title as the project title, make up a new title for the project.
         b. Really look at the job description and see if they mention any projects they worked on, don't just generate a bunch of projects based on small things they did.
         c. Use a max of 3 projects from the job history, the top recent ones that have the most detail
     4. For every candidate item:
+         • Set "source" to its "id".
          • Use its "title".
          • # Description rules:
            1. Synthesize "description" and bullet list from the item's description field; output only plain text (no markdown). 
@@ -140,12 +200,6 @@ async def projects_node(state: OverallState):
            3. Use next line seperators: \n\n after the overview and in between bullet points also use \n
            4. max 3 bullet points, or less if the content is very short.
            5. keep total length ≤70 words.
-         • Extract URLs from links provided in the description:
-             – Image extensions ⇒ images[]
-             – GitHub / GitLab ⇒ sourceUrl
-             – YouTube / *.mp4 ⇒ demoVideoUrl
-             – Netlify / Vercel / Cloudflare / *.app ⇒ liveDemoUrl
-         • Infer technologies by matching common tech terms appearing in title or description.
     4. Remove duplicate projects (case-insensitive title match).
     5. Sort projects by:
          a. Most recent end/start date
@@ -160,19 +214,9 @@ async def projects_node(state: OverallState):
     ... other keys ...
        "projects": [
         {
+            "id": "p0",
             "title": "Agentforce Creator MCP",
-            "date": {
-                "start": {
-                    "month": 5,
-                    "day": null,
-                    "year": 2025
-                },
-                "end": {
-                    "month": 5,
-                    "day": null,
-                    "year": 2025
-                }
-            },
+            "date": {"start": "2025-05", "end": "2025-05"},
             "description": "# AgentForce Creator MCP\n\nAn intelligent MCP server that automatically generates and deploys Agentforce agents on Salesforce. In this demo we connect to a Salesforce org, let the agent analyze support case history to identify common issues, and create a tailored AI agent based on this analysis. \n\n**Key Features:**\n- Analyzes Salesforce case data to identify automation opportunities\n- Generates reports with recommendations\n- Automatically creates and deploys custom Agentforce agents\n- Leverages agentforce-sdk and Salesforce MCP servers\n\n**Resources:**\n- 📁 [Source Code](https://github.com/flemx/agent-creator-mcp)\n- 🎥 [Video Demo](https://mrvecyvyomqjougfnpdo.supabase.co/storage/v1/object/public/portfolio//Creating%20an%20AgentForce%20Agent%20(1).mp4)\n- 📸 [Screenshots](https://mrvecyvyomqjougfnpdo.supabase.co/storage/v1/object/public/portfolio//agentforce_creator_mcp.jpg)",
         },
         ... other projects ...
@@ -185,35 +229,86 @@ async def projects_node(state: OverallState):
     {
       "projects": [
         {
+          "source": "p0",
           "title": "Agentforce Creator MCP",
-          "description": "An intelligent MCP server that automatically generates and deploys Agentforce agents on Salesforce.\n\n  • Analyzes support cases for automation opportunities\n• Generates actionable recommendation reports\n• Builds and deploys custom agents automatically",
-          "technologies": ["python", "salesforce", "langchain"],
-          "images": ["https://.../agentforce_creator_mcp.jpg"],
-          "demoVideoUrl": "https://.../AgentForce_Demo.mp4",
-          "sourceUrl": "https://github.com/flemx/agent-creator-mcp"
+          "description": "An intelligent MCP server that automatically generates and deploys Agentforce agents on Salesforce.\n\n  • Analyzes support cases for automation opportunities\n• Generates actionable recommendation reports\n• Builds and deploys custom agents automatically"
         }
       ]
     }
     """
 
+
+def projects_fingerprint(linkedin: PortfolioProfileModel) -> str:
+    """Input fingerprint of the projects section, prompt settings included."""
+    return section_fingerprint(
+        "projects_node", linkedin, PROJECTS_MODEL, PROJECTS_SYSTEM_PROMPT, PROJECTS_PROMPT_TOKENS
+    )
+
+
+@instrument_node("projects_node")
+async def projects_node(state: OverallState):
+    """Node for the projects section."""
+    writer = get_stream_writer()
+    writer(NodeUpdate(current_node="projects_node", data={"status": "started"}, chunk_type="node_update"))
+    linkedin: PortfolioProfileModel = state["linkedin_data"]
+
+    # Unchanged projects / publications / positions: no prompt, no LLM call.
+    fingerprint = projects_fingerprint(linkedin)
+    reused = await reused_section("projects_node", fingerprint, delay=0.002)
+    if reused is not MISSING:
+        return {"projects_data": reused}
+
+    # Links and technologies of every candidate item, added to the LLM's
+    # drafts by their `source` id instead of being generated. Taken from the
+    # full excerpt, before descriptions are truncated to the token budget.
+    excerpt = project_profile_for_projects(linkedin)
+    facts = extract_project_facts(excerpt)
+
     message = f"""
-    Generate a list of projects from the following LinkedIn profile:
-    {linkedin.model_dump_json(indent=2)}
+    Generate a list of projects from the following LinkedIn profile excerpt:
+    {projects_prompt_payload(linkedin, PROJECTS_MODEL, excerpt, max_tokens=PROJECTS_PROMPT_TOKENS)}
     """
 
     messages = [
-            SystemMessage(content=system_content),
+            SystemMessage(content=PROJECTS_SYSTEM_PROMPT),
             HumanMessage(content=message)
         ]
     
-    model = ChatOpenAI(model="gpt-4o-mini")
-    model_with_structure = model.with_structured_output(ProjectsSectionDict)
-
-    response = {}
-    async for chunk in model_with_structure.astream(messages):
-        response = chunk
-        writer(StructuredChunk(current_node="projects_node", data=response, chunk_type="structured"))
-       
+    # Same model + prompts ⇒ same result: replay it instead of calling the LLM.
+    # Concurrent runs with the same prompts (in any worker sharing the cache)
+    # wait for the first one's answer instead of making their own call.
+    cache_key = content_key(PROJECTS_MODEL, PROJECTS_SYSTEM_PROMPT, message)
+    async with PROJECTS_CACHE.lease(cache_key) as response:
+        if response is not MISSING:
+            await stream_state("projects_node", response, delay=0.002)
+            await SECTION_CACHE.set(fingerprint, response)
+            writer(NodeUpdate(current_node="projects_node", data={"status": "completed"}, chunk_type="node_update"))
+            return {
+                "projects_data": response
+            }
+
+        # Off the event loop: the first call imports langchain_openai, which
+        # must not stall the other sections' streams.
+        model_with_structure = await asyncio.to_thread(projects_model)
+
+        # Delta clients only get what changed since the previous partial answer.
+        streamer = PartialStreamer("projects_node")
+        response = {}
+        async with LLM_LIMITER.slot():
+            start = time.perf_counter()
+            first_token = True
+            async for chunk in model_with_structure.astream(messages):
+                if first_token:
+                    UPSTREAM_LATENCY.labels("openai", "first_token").observe(time.perf_counter() - start)
+                    first_token = False
+                response = with_project_facts(chunk, facts)
+                streamer.emit(response)
+            UPSTREAM_LATENCY.labels("openai", "total").observe(time.perf_counter() - start)
+        streamer.close()
+
+        if response:
+            await PROJECTS_CACHE.set(cache_key, response)
+            await SECTION_CACHE.set(fingerprint, response)
     writer(NodeUpdate(current_node="projects_node", data={"status": "completed"}, chunk_type="node_update"))
     return {
         "projects_data": response
@@ -245,11 +340,16 @@ def _format_date_range(date_range):
     return ""
 
 
+@instrument_node("experience_node")
 async def experience_node(state: OverallState):
     """Build structured experience data from LinkedIn position groups."""
     writer = get_stream_writer()
     writer(NodeUpdate(current_node="experience_node", data={"status": "started"}, chunk_type="node_update"))
-    linkedin: PersonalProfileModel = state["linkedin_data"]
+    linkedin: PortfolioProfileModel = state["linkedin_data"]
+    fingerprint = section_fingerprint("experience_node", linkedin)
+    reused = await reused_section("experience_node", fingerprint, delay=0.001)
+    if reused is not MISSING:
+        return {"experience_data": reused}
     company_groups: list[ExperienceCompanyDict] = []
 
     for group in linkedin.position_groups or []:
@@ -296,6 +396,7 @@ async def experience_node(state: OverallState):
 
     # Stream chunk for real-time UI updates (small delay to throttle output)
     await stream_state("experience_node", experience_data, delay=0.001)
+    await SECTION_CACHE.set(fingerprint, experience_data)
     writer(NodeUpdate(current_node="experience_node", data={"status": "completed"}, chunk_type="node_update"))
     return {
         "experience_data": experience_data,
@@ -309,14 +410,42 @@ graph_builder.add_node("projects", projects_node)
 graph_builder.add_node("experience", experience_node)
 
 graph_builder.add_edge(START, "linkedin")
-graph_builder.add_edge("about", "projects")
-graph_builder.add_edge("projects", "experience")
-graph_builder.add_edge("experience", END)
+# about / projects / experience only read `linkedin_data`, so they run in the
+# same superstep and their custom events interleave on the stream; the
+# multi-source edge joins them before END.
 graph_builder.add_conditional_edges(
-    "linkedin", route_node
+    "linkedin", route_node, [*SECTION_NODES, END]
 )
+graph_builder.add_edge(SECTION_NODES, END)
 
 
 graph = graph_builder.compile()
 
 
+def checkpoint_serde() -> JsonPlusSerializer:
+    """Checkpoint serializer that may restore the profile models of the state.
+
+    LangGraph warns about (and will block) deserializing types that are not
+    allow-listed, which would break resuming silently; the models of
+    :mod:`.schemas.linkedin_profile_models` are allowed explicitly.
+    """
+    models = [
+        value
+        for value in vars(linkedin_profile_models).values()
+        if isinstance(value, type)
+        and issubclass(value, BaseModel)
+        and value.__module__ == linkedin_profile_models.__name__
+    ]
+    try:
+        return JsonPlusSerializer(allowed_msgpack_modules=models)
+    except TypeError:  # older langgraph-checkpoint: no allowlist, nothing is blocked
+        return JsonPlusSerializer()
+
+
+# Same graph with per-thread checkpoints (``config["configurable"]["thread_id"]``)
+# after every node, so an interrupted stream can be resumed without re-running
+# the nodes that already finished (see `app.resume`).
+CHECKPOINTER = InMemorySaver(serde=checkpoint_serde())
+resumable_graph = graph_builder.compile(checkpointer=CHECKPOINTER)
+
+
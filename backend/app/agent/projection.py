@@ -0,0 +1,342 @@
+"""Compact profile views used to build LLM prompts and section fingerprints.
+
+`projects_node` only needs projects, publications and the position history,
+so instead of sending ``linkedin.model_dump_json(indent=2)`` (every field,
+``extra="allow"`` data, nulls and indentation) we send a null-stripped,
+non-indented projection of just those fields.
+
+:func:`fit_to_budget` trims that projection to an input-token budget, so
+oversized profiles can't blow up the prompt (and the latency of the call).
+
+:func:`section_fingerprint` hashes the fields a section node reads, so a
+section whose inputs didn't change can be reused instead of recomputed.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from .cache import content_key
+from .metrics import PROMPT_TOKENS, PROMPT_TOKENS_CUT
+from .schemas.linkedin_profile_models import DateModel, DateRangeModel, PortfolioProfileModel
+
+logger = logging.getLogger(__name__)
+
+try:  # optional – shipped with langchain-openai, but not required
+    import tiktoken
+except ImportError:  # pragma: no cover
+    tiktoken = None
+
+
+def _strip_empty(value: Any) -> Any:
+    """Recursively drop ``None``, empty strings and empty containers."""
+    if isinstance(value, dict):
+        stripped = {k: _strip_empty(v) for k, v in value.items()}
+        return {k: v for k, v in stripped.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        stripped = [_strip_empty(v) for v in value]
+        return [v for v in stripped if v not in (None, "", [], {})]
+    return value
+
+
+def _format_date(date: DateModel | None) -> str | None:
+    """``DateModel`` → ``"2025-05"`` / ``"2025"`` (``None`` when no year)."""
+    if date is None or not date.year:
+        return None
+    return f"{date.year}-{date.month:02d}" if date.month else str(date.year)
+
+
+def _format_range(date_range: DateRangeModel | None) -> dict[str, str | None] | None:
+    if date_range is None:
+        return None
+    return {"start": _format_date(date_range.start), "end": _format_date(date_range.end)}
+
+
+_ID_PREFIXES = {"projects": "p", "publications": "pub", "positions": "pos"}
+
+
+def project_profile_for_projects(linkedin: PortfolioProfileModel) -> dict[str, Any]:
+    """Return the fields of `linkedin` the project extractor reads.
+
+    Positions without a description are dropped since they can't describe a
+    project; dates are flattened to ``YYYY-MM`` strings. Every item gets an
+    ``id`` (``p0``, ``pub0``, ``pos0``, ...) the LLM cites as a project's
+    ``source`` (see :mod:`.extraction`).
+    """
+    projection = {
+        "projects": [
+            {
+                "title": project.title,
+                "date": _format_range(project.date),
+                "description": project.description,
+            }
+            for project in linkedin.projects or []
+        ],
+        "publications": [
+            {
+                "name": publication.name,
+                "publisher": publication.publisher,
+                "url": publication.url,
+                "date": _format_date(publication.date),
+            }
+            for publication in linkedin.publications or []
+        ],
+        "positions": [
+            {
+                "company": group.company.name if group.company else position.company,
+                "title": position.title,
+                "date": _format_range(position.date),
+                "description": position.description,
+            }
+            for group in linkedin.position_groups or []
+            for position in group.profile_positions or []
+            if position.description
+        ],
+    }
+    for section, prefix in _ID_PREFIXES.items():
+        projection[section] = [{"id": f"{prefix}{i}", **item} for i, item in enumerate(projection[section])]
+    return _strip_empty(projection)
+
+
+def compact_json(data: Any) -> str:
+    """Serialise `data` without indentation or ASCII escaping."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+@functools.cache
+def _encoding(model: str) -> Any:
+    """The tiktoken encoding of `model`, or None (looked up once per model)."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:  # unknown model / encoding files unavailable offline
+        logger.debug("No tiktoken encoding for %s, estimating token counts", model)
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Count prompt tokens with tiktoken, or estimate (≈4 chars/token) without it."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """The first `max_tokens` tokens of `text`, followed by "…" when cut."""
+    encoding = _encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens]).rstrip() + "…"
+    if len(text) <= max_tokens * 4:
+        return text
+    return text[: max_tokens * 4].rstrip() + "…"
+
+
+@dataclass
+class BudgetCut:
+    """What :func:`fit_to_budget` removed from an excerpt."""
+
+    tokens_before: int
+    tokens_after: int
+    truncated: int = 0
+    dropped: int = 0
+
+    @property
+    def tokens_cut(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+# Projects the extractor returns / positions it uses at most (see the prompt).
+MAX_PROJECTS = 8
+MAX_POSITIONS_USED = 3
+# Items shorter than this aren't worth keeping in a truncated form.
+MIN_ITEM_TOKENS = 40
+
+
+def _recency(item: dict[str, Any]) -> str:
+    """Sort key: the ``YYYY-MM`` start (or date) of an excerpt item."""
+    date = item.get("date")
+    return (date.get("start") or date.get("end") or "") if isinstance(date, dict) else (date or "")
+
+
+def _ranked(excerpt: dict[str, Any]) -> list[tuple[str, dict[str, Any]]]:
+    """(section, item) pairs, most useful to the project extractor first.
+
+    As many projects and positions as the extractor can use, then
+    publications, then the rest; most recent first within each group.
+    """
+    by_recency = {
+        section: sorted(excerpt.get(section, []), key=_recency, reverse=True)
+        for section in ("projects", "publications", "positions")
+    }
+    projects, positions = by_recency["projects"], by_recency["positions"]
+    return [
+        *(("projects", item) for item in projects[:MAX_PROJECTS]),
+        *(("positions", item) for item in positions[:MAX_POSITIONS_USED]),
+        *(("publications", item) for item in by_recency["publications"]),
+        *(("projects", item) for item in projects[MAX_PROJECTS:]),
+        *(("positions", item) for item in positions[MAX_POSITIONS_USED:]),
+    ]
+
+
+def fit_to_budget(
+    excerpt: dict[str, Any], max_tokens: int, model: str = "gpt-4o-mini"
+) -> tuple[dict[str, Any], BudgetCut]:
+    """Trim a :func:`project_profile_for_projects` excerpt to `max_tokens`.
+
+    Items are taken in :func:`_ranked` order. An item larger than a quarter
+    of the budget, or than what is left of it, gets its description
+    truncated to fit; it is dropped instead when that would leave less than
+    ``MIN_ITEM_TOKENS`` of description. The kept items keep their ``id`` and
+    their order in the excerpt.
+    """
+    tokens_before = count_tokens(compact_json(excerpt), model)
+    if tokens_before <= max_tokens:
+        return excerpt, BudgetCut(tokens_before, tokens_before)
+
+    cut = BudgetCut(tokens_before, 0)
+    item_budget = max(MIN_ITEM_TOKENS, max_tokens // 4)
+    # The section keys, brackets and separators.
+    remaining = max_tokens - count_tokens(compact_json({section: [] for section in excerpt}), model)
+    kept: dict[str, dict[str, Any]] = {}
+    for _, item in _ranked(excerpt):
+        if remaining < MIN_ITEM_TOKENS:
+            cut.dropped += 1
+            continue
+        tokens = count_tokens(compact_json(item), model) + 1
+        if tokens > min(item_budget, remaining) and item.get("description"):
+            overflow = tokens - min(item_budget, remaining)
+            description_tokens = count_tokens(item["description"], model)
+            if description_tokens - overflow < MIN_ITEM_TOKENS:
+                cut.dropped += 1
+                continue
+            item = {**item, "description": truncate_tokens(item["description"], description_tokens - overflow, model)}
+            tokens = count_tokens(compact_json(item), model) + 1
+            cut.truncated += 1
+        if tokens > remaining:
+            cut.dropped += 1
+            continue
+        remaining -= tokens
+        kept[item["id"]] = item
+
+    budgeted = {
+        section: [kept[item["id"]] for item in items if item["id"] in kept]
+        for section, items in excerpt.items()
+    }
+    cut.tokens_after = count_tokens(compact_json(budgeted), model)
+    return budgeted, cut
+
+
+# Log the tokens of every projects prompt next to the full profile dump it
+# replaces. Off by default: it dumps and tokenizes the whole profile on each
+# call, and the app runs with DEBUG logging.
+PROMPT_TOKEN_REPORT = os.getenv("PROMPT_TOKEN_REPORT", "0") in ("1", "true", "True")
+
+
+def projects_prompt_payload(
+    linkedin: PortfolioProfileModel,
+    model: str = "gpt-4o-mini",
+    excerpt: dict[str, Any] | None = None,
+    max_tokens: int | None = None,
+) -> str:
+    """Compact JSON of :func:`project_profile_for_projects` (or of `excerpt`,
+    when the caller already built it), trimmed to `max_tokens` if given.
+
+    Cut tokens are logged and counted in ``portfolio_prompt_tokens_cut_total``.
+    With ``PROMPT_TOKEN_REPORT`` set, the token count is logged next to the
+    full ``model_dump_json(indent=2)`` payload it replaces.
+    """
+    if excerpt is None:
+        excerpt = project_profile_for_projects(linkedin)
+    if max_tokens is not None:
+        excerpt, cut = fit_to_budget(excerpt, max_tokens, model)
+        PROMPT_TOKENS.labels("projects").observe(cut.tokens_after)
+        if cut.tokens_cut:
+            PROMPT_TOKENS_CUT.labels("projects").inc(cut.tokens_cut)
+            logger.info(
+                "projects prompt for %s over budget: %d → %d tokens (%d items truncated, %d dropped)",
+                linkedin.profile_id,
+                cut.tokens_before,
+                cut.tokens_after,
+                cut.truncated,
+                cut.dropped,
+            )
+    payload = compact_json(excerpt)
+    if PROMPT_TOKEN_REPORT and logger.isEnabledFor(logging.DEBUG):
+        before = count_tokens(linkedin.model_dump_json(indent=2), model)
+        after = count_tokens(payload, model)
+        logger.debug(
+            "projects prompt for %s: %d → %d tokens (-%.0f%%)",
+            linkedin.profile_id,
+            before,
+            after,
+            100 * (before - after) / before if before else 0,
+        )
+    return payload
+
+
+# Profile fields each section node reads (see `portfolio_graph`).
+SECTION_FIELDS: dict[str, frozenset[str]] = {
+    "about_node": frozenset(
+        {
+            "profile_id",
+            "first_name",
+            "last_name",
+            "sub_title",
+            "profile_picture",
+            "summary",
+            "location",
+            "languages",
+            "skills",
+            "contact_info",
+        }
+    ),
+    "experience_node": frozenset({"position_groups"}),
+}
+
+# Bump when a node's output changes for the same inputs, so fingerprints of
+# sections stored by the previous version no longer match.
+SECTION_VERSION = 2
+
+
+def section_inputs(node: str, linkedin: PortfolioProfileModel) -> str:
+    """JSON of the part of `linkedin` that section `node` is computed from.
+
+    ``projects_node`` uses the projection its prompt is built from, so
+    position changes without a description don't count as changes.
+    """
+    if node == "projects_node":
+        return compact_json(project_profile_for_projects(linkedin))
+    # Serialised by pydantic-core: about twice as fast as dumping to dicts
+    # and re-encoding them for the hash.
+    return linkedin.model_dump_json(include=set(SECTION_FIELDS[node]))
+
+
+def section_fingerprint(node: str, linkedin: PortfolioProfileModel, *extra: Any) -> str:
+    """Content hash of the inputs of section `node` (plus `extra`, e.g. a model name)."""
+    return content_key(node, SECTION_VERSION, section_inputs(node, linkedin), *extra)
+
+
+__all__ = [
+    "project_profile_for_projects",
+    "compact_json",
+    "count_tokens",
+    "truncate_tokens",
+    "BudgetCut",
+    "fit_to_budget",
+    "PROMPT_TOKEN_REPORT",
+    "projects_prompt_payload",
+    "SECTION_FIELDS",
+    "SECTION_VERSION",
+    "section_inputs",
+    "section_fingerprint",
+]
@@ -1,4 +1,4 @@
-from typing import TypedDict, Any, Literal
+from typing import TypedDict, Any, Literal, List
 
 class StructuredChunk(TypedDict):
     chunk_type: Literal["structured"] = "structured"
@@ -10,4 +10,14 @@ class NodeUpdate(TypedDict):
     current_node: str
     data: Any
 
-__all__ = ["StructuredChunk", "NodeUpdate"]
+class PatchOp(TypedDict):
+    op: Literal["add", "append"]
+    path: str
+    value: Any
+
+class PatchChunk(TypedDict):
+    chunk_type: Literal["patch"] = "patch"
+    current_node: str
+    ops: List[PatchOp]
+
+__all__ = ["StructuredChunk", "NodeUpdate", "PatchOp", "PatchChunk"]
@@ -365,6 +365,50 @@ class PersonalProfileModel(BaseModel):
 # Convenience alias
 ProfileDetailsResponse = PersonalProfileModel
 
+
+# ---------------------------------------------------------------------------
+# Portfolio view – only the fields the graph nodes read
+# ---------------------------------------------------------------------------
+
+
+class PortfolioProfileModel(BaseModel):
+    """The parts of a personal profile the portfolio graph reads.
+
+    Only these fields are validated; every other field of the API response
+    (education, patents, related profiles, …) is kept as raw JSON in the model
+    extras, unvalidated, so it is still dumped / cached but costs no decoding.
+    Use :meth:`to_full_profile` when the complete typed model is needed.
+    """
+
+    model_config = ConfigDict(extra="allow")
+
+    profile_id: str
+    first_name: str
+    last_name: str
+
+    sub_title: Optional[str] = None
+    profile_picture: Optional[str] = None
+    summary: Optional[str] = None
+    location: Optional[AddressModel] = None
+    languages: Optional[LanguagesModel] = None
+
+    projects: Optional[List[ProjectModel]] = None
+    publications: Optional[List[PublicationModel]] = None
+    position_groups: Optional[List[PositionGroupModel]] = None
+
+    skills: Optional[List[str]] = None
+    contact_info: Optional[ContactModel] = None
+
+    def full_name(self) -> str:
+        """Return the display name that LinkedIn shows (first + last)."""
+
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def to_full_profile(self) -> PersonalProfileModel:
+        """Validate the complete :class:`PersonalProfileModel` (incl. extras)."""
+
+        return PersonalProfileModel.model_validate(self.model_dump())
+
 __all__ = [
     "DateModel",
     "DateRangeModel",
@@ -399,4 +443,5 @@ __all__ = [
     "VerificationsInfoModel",
     "PersonalProfileModel",
     "ProfileDetailsResponse",
+    "PortfolioProfileModel",
 ]
\ No newline at end of file
@@ -37,3 +37,22 @@ class ProjectsSectionDict(TypedDict):
     """
 
     projects: List[ProjectDict]
+
+
+class ProjectDraftDict(TypedDict):
+    """A project as written by the projects LLM.
+
+    ``source`` is the ``id`` of the profile item it was made from; links and
+    technologies are extracted from that item without the LLM (see
+    ``app.agent.extraction``).
+    """
+
+    source: str
+    title: str
+    description: str
+
+
+class ProjectDraftsDict(TypedDict):
+    """Structured output of the projects LLM: ``projects`` of :class:`ProjectDraftDict`."""
+
+    projects: List[ProjectDraftDict]
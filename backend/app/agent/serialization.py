@@ -0,0 +1,84 @@
+"""JSON encoding for streamed events.
+
+Every event is encoded exactly once, straight to the bytes of an SSE frame
+(:func:`sse_frame`). `orjson` is used when installed (``pip install
+portfolio-backend[fast]``), the standard library otherwise; both produce
+compact UTF-8 JSON and turn Pydantic models into their JSON dump on the fly,
+so payloads don't need a conversion pass before encoding.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+try:  # optional – much faster encoder
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+_JSON_SCALARS = (str, int, float, bool, type(None))
+
+
+def _default(obj: Any) -> Any:
+    """Encoder fallback for values JSON has no representation for."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        """Encode `obj` as compact UTF-8 JSON."""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+else:  # pragma: no cover
+
+    def dumps(obj: Any) -> bytes:
+        """Encode `obj` as compact UTF-8 JSON."""
+        return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def sse_frame(message: Any, event_id: str | None = None) -> bytes:
+    """Encode `message` as one ``data: <json>\\n\\n`` Server-Sent Events frame,
+    preceded by an ``id:`` line when `event_id` is given."""
+    if event_id is None:
+        return b"data: " + dumps(message) + b"\n\n"
+    return b"id: " + event_id.encode() + b"\ndata: " + dumps(message) + b"\n\n"
+
+
+def copy_json(value: Any) -> Any:
+    """Copy a tree of dicts / lists of JSON scalars (faster than ``deepcopy``)."""
+    if isinstance(value, dict):
+        return {k: v if isinstance(v, _JSON_SCALARS) else copy_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [v if isinstance(v, _JSON_SCALARS) else copy_json(v) for v in value]
+    return value
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Convert `obj` (Pydantic models, TypedDicts, containers) to JSON data.
+
+    Models are dumped in one ``model_dump(mode="json")`` call; dicts and lists
+    are only walked where they hold something that isn't already JSON data.
+    """
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, dict):
+        if all(isinstance(v, _JSON_SCALARS) for v in obj.values()):
+            return obj
+        return {k: v if isinstance(v, _JSON_SCALARS) else to_jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [v if isinstance(v, _JSON_SCALARS) else to_jsonable(v) for v in obj]
+    return obj
+
+
+__all__ = ["ENCODER", "dumps", "sse_frame", "copy_json", "to_jsonable"]
@@ -1,26 +1,106 @@
 
 import os
 import json
+import time
+import functools
 from typing import Any, Mapping
 import json, asyncio
-from pydantic import BaseModel
-from langgraph.config import get_stream_writer
-from .schemas.linkedin_profile_models import PersonalProfileModel
-from .schemas.custom_chunks import StructuredChunk
+from pydantic_core import from_json
+from langgraph.config import get_stream_writer, get_config
+from .schemas.linkedin_profile_models import PortfolioProfileModel
+from .schemas.custom_chunks import StructuredChunk, PatchChunk, PatchOp
+from .patches import join_pointer, add_op, append_op, diff_ops
+from .serialization import copy_json, to_jsonable
+from .cache import TTLCache, make_store
+from .http_client import HTTP_POOL
+from .metrics import STREAM_PACING, UPSTREAM_LATENCY
+from .limits import (
+    PROAPIS_LIMITER,
+    UPSTREAM_ATTEMPTS,
+    UPSTREAM_RETRY_BASE,
+    UPSTREAM_RETRY_MAX,
+    UpstreamRateLimited,
+    parse_retry_after,
+    retry_async,
+)
 import aiohttp
 import logging
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "linkedin_data.json")
-with open(DATA_PATH, "r") as f:
-    LINKEDIN_DATA = json.load(f)
 
 
+@functools.cache
+def linkedin_fixture() -> dict[str, Any]:
+    """The bundled fixture profile, read on first use (not at import time).
+
+    Shared between callers: copy it before mutating.
+    """
+    with open(DATA_PATH, "r") as f:
+        return json.load(f)
+
+
+
+STREAM_FORMATS = ("snapshot", "delta")
+DEFAULT_STREAM_FORMAT = "snapshot"
+# Number of delta frames between two full keyframes.
+KEYFRAME_INTERVAL = 200
+# Frame coalescing: 0 disables it (one frame per mutation).
+DEFAULT_FRAME_INTERVAL = 0.0
+FRAME_BOUNDARIES = ("time", "word")
+# Characters after which a "word" boundary frame may be flushed.
+WORD_BOUNDARY_CHARS = frozenset(" \n\t.,;:!?")
+
+
+def _configurable(key: str, default: Any = None) -> Any:
+    """Read ``config["configurable"][key]`` of the current graph run."""
+    try:
+        config = get_config()
+    except RuntimeError:  # called outside of a runnable context
+        return default
+    return config.get("configurable", {}).get(key, default)
+
+
+def get_stream_format() -> str:
+    """Return the stream format requested for the current graph run.
+
+    The format is passed by the API layer via
+    ``config["configurable"]["stream_format"]``; anything unknown falls back
+    to the default snapshot format.
+    """
+    stream_format = _configurable("stream_format")
+    return stream_format if stream_format in STREAM_FORMATS else DEFAULT_STREAM_FORMAT
+
+
+def streams_sections() -> bool:
+    """Whether the current graph run streams section chunks to a client.
+
+    False when ``config["configurable"]["stream_sections"]`` is false, as set
+    by API endpoints that only return the final state.
+    """
+    return bool(_configurable("stream_sections", True))
+
+
+# Reuse stored sections whose input fingerprint is unchanged (SECTION_CACHE).
+SECTION_REUSE = os.getenv("SECTION_REUSE", "1") in ("1", "true", "True")
+
+
+def reuses_sections() -> bool:
+    """Whether the current graph run may reuse sections from :data:`SECTION_CACHE`.
+
+    Defaults to ``SECTION_REUSE``; overridden per run by
+    ``config["configurable"]["reuse_sections"]``.
+    """
+    return bool(_configurable("reuse_sections", SECTION_REUSE))
+
 
 async def stream_state(
     node_name: str,
     data: Mapping[str, Any],
     *,
     delay: float = 0.05,
+    stream_format: str | None = None,
+    frame_interval: float | None = None,
+    frame_boundary: str | None = None,
 ) -> None:
     """Stream `data` in a structured, progressive way.
 
@@ -29,8 +109,38 @@ async def stream_state(
     – Keeps the original dict shape, adding keys/characters incrementally.
     – For strings → stream one character at a time; for other primitives
       just emit once.
+
+    With ``stream_format="delta"`` only the change of each step is emitted as
+    a ``patch`` chunk (see :mod:`.patches`), with a full snapshot keyframe at
+    the start, every ``KEYFRAME_INTERVAL`` frames and at the end.
+
+    ``frame_interval`` (seconds) enables frame coalescing: every step still
+    accounts for ``delay`` of pacing, but mutations are batched and written
+    (and slept for) once per ``frame_interval`` of accumulated pacing, so the
+    typing speed is unchanged while writer calls and event-loop wakeups drop
+    by roughly ``frame_interval / delay``. With ``frame_boundary="word"``
+    frames are preferably cut after whitespace/punctuation (at most
+    ``2 * frame_interval`` late). Both default to the run's
+    ``config["configurable"]`` values.
+
+    Chunks are written as plain dicts, not JSON strings: the SSE layer encodes
+    each event exactly once (see :mod:`.serialization`).
+
+    Runs whose config sets ``stream_sections`` to false (non-streaming API
+    calls) only need the final state: nothing is emitted and nothing paced.
     """
+    if not streams_sections():
+        return
     writer = get_stream_writer()
+    if stream_format is None:
+        stream_format = get_stream_format()
+    if frame_interval is None:
+        frame_interval = float(_configurable("frame_interval", DEFAULT_FRAME_INTERVAL) or 0.0)
+    if frame_boundary is None:
+        frame_boundary = _configurable("frame_boundary", "time")
+    delta = stream_format == "delta"
+    word_boundaries = frame_boundary == "word"
+    pacing = STREAM_PACING.labels(node_name)
 
     # The mutable snapshot that we progressively fill.
     snapshot: StructuredChunk = {
@@ -38,61 +148,248 @@ async def stream_state(
         "current_node": node_name,
         "data": {},
     }
+    frames_since_keyframe = 0
+    pending_ops: list[PatchOp] = []
+    pending_delay = 0.0
+    dirty = False
+
+    async def flush(keyframe: bool = False):
+        """Write one frame with everything mutated since the last one."""
+        nonlocal frames_since_keyframe, pending_delay, dirty
+        if delta and pending_ops and not keyframe and frames_since_keyframe < KEYFRAME_INTERVAL:
+            frames_since_keyframe += 1
+            patch: PatchChunk = {"chunk_type": "patch", "current_node": node_name, "ops": list(pending_ops)}
+            writer(patch)
+        else:
+            frames_since_keyframe = 0
+            # `snapshot` keeps being filled in, so hand the writer a copy.
+            writer({**snapshot, "data": copy_json(snapshot["data"])})
+        pending_ops.clear()
+        dirty = False
+        if pending_delay:
+            pacing.inc(pending_delay)
+            await asyncio.sleep(pending_delay)
+            pending_delay = 0.0
 
-    def json_dump(obj: Any) -> str:
-        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+    async def send(op: PatchOp, boundary: bool = True):
+        nonlocal pending_delay, dirty
+        dirty = True
+        if delta:
+            last = pending_ops[-1] if pending_ops else None
+            if (
+                op["op"] == "append"
+                and last is not None
+                and last["path"] == op["path"]
+                and isinstance(last["value"], str)
+            ):
+                # Merge consecutive appends (and add "" + appends) on one path
+                last["value"] += op["value"]
+            else:
+                pending_ops.append(op)
+        pending_delay += delay
+        if pending_delay >= frame_interval and (
+            boundary or not word_boundaries or pending_delay >= 2 * frame_interval
+        ):
+            await flush()
 
-    async def send():
-        writer(json_dump(snapshot))
-        if delay:
-            await asyncio.sleep(delay)
+    await flush(keyframe=True)  # initial empty snapshot
 
-    await send()  # initial empty snapshot
+    async def stream_string(target: Any, key: Any, add_path: str, path: str, value: str):
+        target[key] = ""
+        await send(add_op(add_path, ""))
+        for ch in value:
+            target[key] += ch
+            await send(append_op(path, ch), boundary=ch in WORD_BOUNDARY_CHARS)
 
-    async def recurse(target: Any, source: Any):
+    async def recurse(target: Any, source: Any, path: str):
         """Copy `source` into `target`, streaming after each incremental step."""
         if isinstance(source, dict):
             for k, v in source.items():
+                child_path = join_pointer(path, k)
                 if isinstance(v, (dict, list)):
                     target[k] = {} if isinstance(v, dict) else []
-                    await send()
-                    await recurse(target[k], v)
+                    await send(add_op(child_path, {} if isinstance(v, dict) else []))
+                    await recurse(target[k], v, child_path)
+                elif isinstance(v, str):
+                    await stream_string(target, k, child_path, child_path, v)
                 else:
-                    if isinstance(v, str):
-                        target[k] = ""
-                        await send()
-                        for ch in v:
-                            target[k] += ch
-                            await send()
-                    else:
-                        target[k] = v
-                        await send()
+                    target[k] = v
+                    await send(add_op(child_path, v))
         elif isinstance(source, list):
             for item in source:
+                child_path = join_pointer(path, len(target))
                 if isinstance(item, (dict, list)):
                     container = {} if isinstance(item, dict) else []
                     target.append(container)
-                    await send()
-                    await recurse(container, item)
+                    await send(add_op(f"{path}/-", {} if isinstance(item, dict) else []))
+                    await recurse(container, item, child_path)
+                elif isinstance(item, str):
+                    target.append("")
+                    await stream_string(target, -1, f"{path}/-", child_path, item)
                 else:
-                    if isinstance(item, str):
-                        partial = ""
-                        target.append(partial)
-                        await send()
-                        for ch in item:
-                            partial += ch
-                            target[-1] = partial
-                            await send()
-                    else:
-                        target.append(item)
-                        await send()
+                    target.append(item)
+                    await send(add_op(f"{path}/-", item))
 
-    await recurse(snapshot["data"], data)
+    await recurse(snapshot["data"], data, "")
+    if delta and (dirty or frames_since_keyframe):
+        # Closing keyframe (covers anything still pending) so clients end on
+        # the exact state.
+        await flush(keyframe=True)
+    elif dirty:
+        await flush()
+
+
+class PartialStreamer:
+    """Stream successive partial versions of a section (LLM structured output).
+
+    Call :meth:`emit` with every partial object and :meth:`close` at the end.
+    In the snapshot format each partial is written as a ``structured`` chunk,
+    as before. In the delta format only the difference to the previously
+    written version is sent as a ``patch`` chunk (see
+    :func:`.patches.diff_ops`) – the new keys, list items and string suffixes
+    – with keyframes at the start, every ``KEYFRAME_INTERVAL`` frames and at
+    the end, like :func:`stream_state`.
+
+    With a ``frame_interval`` partials arriving less than that many seconds
+    after the last written frame are folded into the next one.
+    """
+
+    def __init__(
+        self,
+        node_name: str,
+        *,
+        stream_format: str | None = None,
+        frame_interval: float | None = None,
+    ) -> None:
+        self.node_name = node_name
+        self.enabled = streams_sections()
+        self.writer = get_stream_writer()
+        self.delta = (stream_format or get_stream_format()) == "delta"
+        if frame_interval is None:
+            frame_interval = float(_configurable("frame_interval", DEFAULT_FRAME_INTERVAL) or 0.0)
+        self.frame_interval = frame_interval
+        # Last written version (as the client has it) and the latest partial.
+        self.sent: Any = None
+        self.latest: Any = None
+        self.frames_since_keyframe = 0
+        self.last_write = float("-inf")
+
+    def emit(self, partial: Any) -> None:
+        if not self.enabled:
+            return
+        # The producer may keep mutating `partial`, so keep a copy.
+        self.latest = copy_json(partial)
+        now = time.monotonic()
+        if now - self.last_write >= self.frame_interval:
+            self.last_write = now
+            self._write()
+
+    def close(self) -> None:
+        """Write what is still pending (as a keyframe in the delta format)."""
+        if not self.enabled or self.latest is None:
+            return
+        pending = self.latest != self.sent
+        if self.delta and (pending or self.frames_since_keyframe):
+            self._write(keyframe=True)
+        elif pending:
+            self._write()
+
+    def _write(self, keyframe: bool = False) -> None:
+        if self.delta and self.sent is not None and not keyframe and self.frames_since_keyframe < KEYFRAME_INTERVAL:
+            ops = diff_ops(self.sent, self.latest)
+            if not ops:
+                return
+            self.frames_since_keyframe += 1
+            patch: PatchChunk = {"chunk_type": "patch", "current_node": self.node_name, "ops": ops}
+            self.writer(patch)
+        else:
+            self.frames_since_keyframe = 0
+            snapshot: StructuredChunk = {"chunk_type": "structured", "current_node": self.node_name, "data": self.latest}
+            self.writer(snapshot)
+        # Written frames may be held by slow subscribers: never mutate them.
+        self.sent = self.latest
 
 
 from typing import Optional
 
-async def get_linkedin_data(linkedin_id: str) -> Optional[PersonalProfileModel]:
+# Profiles are cached in-process (optionally persisted to PROFILE_CACHE_DIR,
+# or a PROFILE_CACHE_STORE at PROFILE_CACHE_PATH) so repeat views of the same
+# portfolio don't pay for a new scrape.
+PROFILE_CACHE: TTLCache[PortfolioProfileModel] = TTLCache(
+    maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("PROFILE_CACHE_TTL", str(6 * 60 * 60))),
+    store=make_store(
+        os.getenv("PROFILE_CACHE_STORE"),
+        os.getenv("PROFILE_CACHE_PATH"),
+        table="profile_cache",
+        maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "256")),
+    ),
+    persist_dir=os.getenv("PROFILE_CACHE_DIR") or None,
+    serialize=lambda profile: profile.model_dump(mode="json"),
+    deserialize=PortfolioProfileModel.model_validate,
+    name="profile cache",
+)
+
+# Final `projects_node` results keyed by a content hash of model + prompts
+# (see `content_key`). Backed by memory only, or additionally by a "file"
+# directory / "sqlite" or "shared" database given in LLM_CACHE_PATH.
+PROJECTS_CACHE: TTLCache[dict] = TTLCache(
+    maxsize=int(os.getenv("LLM_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 60 * 60))),
+    store=make_store(
+        os.getenv("LLM_CACHE_STORE"),
+        os.getenv("LLM_CACHE_PATH"),
+        table="projects_cache",
+        maxsize=int(os.getenv("LLM_CACHE_SIZE", "512")),
+    ),
+    name="projects cache",
+)
+
+# Finished sections keyed by their input fingerprint (`section_fingerprint`),
+# so a refreshed profile only recomputes the sections whose inputs changed.
+SECTION_CACHE: TTLCache[dict] = TTLCache(
+    maxsize=int(os.getenv("SECTION_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SECTION_CACHE_TTL", str(7 * 24 * 60 * 60))),
+    store=make_store(
+        os.getenv("SECTION_CACHE_STORE"),
+        os.getenv("SECTION_CACHE_PATH"),
+        table="section_cache",
+        maxsize=int(os.getenv("SECTION_CACHE_SIZE", "1024")),
+    ),
+    name="section cache",
+)
+
+
+def decode_profile(data: Any) -> PortfolioProfileModel:
+    """Validate a ProAPIS profile payload (dict or raw JSON bytes) once.
+
+    Raw bytes are parsed by pydantic-core; the ``{"data": {...}}`` envelope
+    ProAPIS sometimes returns is unwrapped. Only the fields the graph reads
+    are validated (see :class:`PortfolioProfileModel`).
+    """
+    if isinstance(data, (bytes, bytearray, str)):
+        data = from_json(data)
+    # The ProAPIS response sometimes nests the data under a "data" key, handle both cases.
+    if isinstance(data, dict) and "data" in data and isinstance(data["data"], dict):
+        data = data["data"]
+    return PortfolioProfileModel.model_validate(data)
+
+
+async def get_linkedin_data(linkedin_id: str) -> Optional[PortfolioProfileModel]:
+    """Return the LinkedIn profile for `linkedin_id`, served from
+    :data:`PROFILE_CACHE` when possible.
+
+    Concurrent requests for the same id share a single upstream call; only
+    successfully fetched profiles are cached.
+    """
+    return await PROFILE_CACHE.get_or_load(
+        linkedin_id,
+        lambda: fetch_linkedin_data(linkedin_id),
+        should_cache=lambda result: isinstance(result, PortfolioProfileModel),
+    )
+
+
+async def fetch_linkedin_data(linkedin_id: str) -> Optional[PortfolioProfileModel]:
     """
     Fetch LinkedIn profile data for a given `linkedin_id` using the ProAPIS
     iScraper endpoint.
@@ -101,6 +398,9 @@ async def get_linkedin_data(linkedin_id: str) -> Optional[PersonalProfileModel]:
     `linkedin_data.json` fixture so the rest of the application can continue
     to operate during development/off-line work.
 
+    ``PROAPIS_BASE_URL`` overrides the API host, e.g. to point at the
+    load-test stand-in (``python -m loadtest.fakes``).
+
     Parameters
     ----------
     linkedin_id : str
@@ -108,7 +408,7 @@ async def get_linkedin_data(linkedin_id: str) -> Optional[PersonalProfileModel]:
 
     Returns
     -------
-    PersonalProfileModel
+    PortfolioProfileModel
         A pydantic model containing the profile details.
     """
 
@@ -118,7 +418,8 @@ async def get_linkedin_data(linkedin_id: str) -> Optional[PersonalProfileModel]:
             "The environment variable 'PROAPIS_KEY' must be set to call the ProAPIS endpoint."
         )
 
-    url = "https://api.proapis.com/iscraper/v4/profile-details"
+    base_url = os.getenv("PROAPIS_BASE_URL", "https://api.proapis.com").rstrip("/")
+    url = f"{base_url}/iscraper/v4/profile-details"
     payload = {
         "profile_id": linkedin_id,
         "bypass_cache": True,
@@ -131,16 +432,29 @@ async def get_linkedin_data(linkedin_id: str) -> Optional[PersonalProfileModel]:
         "X-Api-Key": PROAPIS_KEY,
     }
 
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload, timeout=30) as resp:
+    async def post() -> bytes:
+        # Only the request itself holds a PROAPIS_LIMITER slot, not the retry backoff.
+        async with PROAPIS_LIMITER.slot():
+            session = await HTTP_POOL.get_session()
+            start = time.perf_counter()
+            async with session.post(url, headers=headers, json=payload) as resp:
+                if resp.status in (429, 503):
+                    raise UpstreamRateLimited(
+                        "proapis", resp.status, parse_retry_after(resp.headers.get("Retry-After"))
+                    )
                 resp.raise_for_status()
-                data = await resp.json()
-        # The ProAPIS response sometimes nests the data under a "data" key, handle both cases.
-        if isinstance(data, dict) and "data" in data and isinstance(data["data"], dict):
-            data = data["data"]
+                body = await resp.read()
+            UPSTREAM_LATENCY.labels("proapis", "total").observe(time.perf_counter() - start)
+            return body
 
-        return PersonalProfileModel.model_validate(data)
+    try:
+        body = await retry_async(
+            post,
+            attempts=UPSTREAM_ATTEMPTS,
+            base_delay=UPSTREAM_RETRY_BASE,
+            max_delay=UPSTREAM_RETRY_MAX,
+        )
+        return decode_profile(body)
     except aiohttp.ClientResponseError as http_exc:
         # Specific handling for 404 – profile not found
         if http_exc.status == 404:
@@ -161,19 +475,6 @@ async def get_linkedin_data(linkedin_id: str) -> Optional[PersonalProfileModel]:
         )
         # Adding tempt fallback for development
         if linkedin_id == "fleminks":
-            return PersonalProfileModel.model_validate(LINKEDIN_DATA)
+            return decode_profile(linkedin_fixture())
         else:
             return exc
-
-
-
-def to_jsonable(obj: Any):
-    """Recursively convert BaseModel instances to dict for JSON dumps."""
-    if isinstance(obj, BaseModel):
-        return obj.model_dump()
-    elif isinstance(obj, dict):
-        return {k: to_jsonable(v) for k, v in obj.items()}
-    elif isinstance(obj, (list, tuple, set)):
-        return [to_jsonable(v) for v in obj]
-    else:
-        return obj
\ No newline at end of file
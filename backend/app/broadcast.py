@@ -0,0 +1,355 @@
+"""Share one graph run between concurrent streams of the same profile.
+
+When a portfolio link is shared, many visitors request the same
+`linkedin_id` at once. The first request starts the run; later requests for
+the same key subscribe to it instead of starting their own. Late joiners first
+receive the current state of every section (node status + full snapshot),
+then the live events, so N viewers cost one scrape and one LLM call.
+
+Each message is encoded once and the encoded frame is fanned out to all
+subscribers through a bounded :class:`FrameBuffer` per connection, so a slow
+client neither stalls the run nor makes the server queue frames without
+bound. The run is cancelled once its last subscriber disconnects (after an
+optional grace period).
+
+Live frames carry an event id ``<run id>:<sequence number>``. A client
+reconnecting with the id of the last frame it got is sent just the frames it
+missed when they are still in the run's replay log, and the usual catch-up
+otherwise.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import logging
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable
+
+from .agent.patches import apply_ops
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a run in subscriber queues.
+_END = object()
+
+
+class FrameBuffer:
+    """Bounded per-connection frame queue that collapses stale section frames.
+
+    Frames are tagged with the node they belong to and their kind:
+    ``"snapshot"`` (full section state), ``"patch"`` (delta on top of the
+    previous frames) or ``None`` (status / values / error frames, never
+    dropped). While the buffer holds fewer than ``maxsize`` frames everything
+    is queued as is. Once it is full:
+
+    - a new snapshot replaces all queued snapshot/patch frames of its node;
+    - a new patch drops all queued snapshot/patch frames of its node and
+      queues a *resync* marker instead, which ``resync(node)`` turns into a
+      fresh snapshot frame when the client gets to it. Further frames of that
+      node are dropped until then (the snapshot will include them).
+
+    So at most one pending section frame per node plus the status frames are
+    buffered, whatever the client's speed.
+    """
+
+    def __init__(self, maxsize: int, resync: Callable[[str], Any]) -> None:
+        self.maxsize = maxsize
+        self.resync = resync
+        self.collapsed = 0
+        self._entries: deque[tuple[Any, str | None, str | None]] = deque()
+        self._resync_pending: set[str] = set()
+        self._ready = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop_node_frames(self, node: str) -> None:
+        kept = deque(e for e in self._entries if not (e[1] == node and e[2] in ("snapshot", "patch")))
+        self.collapsed += len(self._entries) - len(kept)
+        self._entries = kept
+
+    def put(self, frame: Any, node: str | None = None, kind: str | None = None) -> None:
+        if kind is not None and node in self._resync_pending:
+            self.collapsed += 1  # covered by the pending resync snapshot
+        elif kind is None or len(self._entries) < self.maxsize:
+            self._entries.append((frame, node, kind))
+        elif kind == "snapshot":
+            self._drop_node_frames(node)  # type: ignore[arg-type]
+            self._entries.append((frame, node, kind))
+        else:
+            self._drop_node_frames(node)  # type: ignore[arg-type]
+            self.collapsed += 1
+            self._entries.append((None, node, "resync"))
+            self._resync_pending.add(node)  # type: ignore[arg-type]
+        self._ready.set()
+
+    async def get(self) -> Any:
+        while not self._entries:
+            self._ready.clear()
+            await self._ready.wait()
+        frame, node, kind = self._entries.popleft()
+        if kind == "resync":
+            self._resync_pending.discard(node)  # type: ignore[arg-type]
+            return self.resync(node)  # type: ignore[arg-type]
+        return frame
+
+
+def _frame_tag(message: dict[str, Any]) -> tuple[str | None, str | None]:
+    """(node, kind) of a message for :meth:`FrameBuffer.put`."""
+    chunk = message.get("data")
+    if message.get("event") != "custom" or not isinstance(chunk, dict):
+        return None, None
+    kind = {"structured": "snapshot", "patch": "patch"}.get(chunk.get("chunk_type"))
+    return (chunk.get("current_node"), kind) if kind else (None, None)
+
+
+class BroadcastRun:
+    """A single in-flight run and the state needed to catch up late joiners."""
+
+    def __init__(self, key: Hashable, run_id: str | None = None, replay_size: int = 0) -> None:
+        self.key = key
+        self.run_id = run_id or uuid.uuid4().hex[:16]
+        # Sequence number of the last message, and (seq, frame, node, kind)
+        # of the last `replay_size` live frames.
+        self.seq = 0
+        self.log: deque[tuple[int, Any, str | None, str | None]] = deque(maxlen=replay_size)
+        # node → sequence number as of the latest resync snapshot sent for
+        # it. That client holds the section newer than its last event id, so
+        # replaying the node's patches from there could apply them twice.
+        self.resynced: dict[str, int] = {}
+        self.subscribers: set[FrameBuffer] = set()
+        # node → "started" / "completed", in first-seen order
+        self.node_status: dict[str, str] = {}
+        # node → current section data (snapshots with patches applied)
+        self.sections: dict[str, Any] = {}
+        # sections copied from their snapshot message, safe to patch in place
+        self._owned: set[str] = set()
+        # final values / error message, once emitted
+        self.final: dict[str, Any] | None = None
+        self.task: asyncio.Task | None = None
+
+    def track(self, message: dict[str, Any]) -> None:
+        """Update the catch-up state with one message."""
+        if message.get("event") in ("values", "error"):
+            self.final = message
+            return
+        chunk = message.get("data")
+        if not isinstance(chunk, dict):
+            return
+        node = chunk.get("current_node")
+        chunk_type = chunk.get("chunk_type")
+        if chunk_type == "node_update":
+            status = (chunk.get("data") or {}).get("status")
+            if status:
+                self.node_status[node] = status
+        elif chunk_type == "structured":
+            self.sections[node] = chunk.get("data")
+            self._owned.discard(node)
+        elif chunk_type == "patch" and node in self.sections:
+            # Copy-on-write: the snapshot message may still be referenced
+            # elsewhere, and ops carry containers that later ops mutate.
+            if node not in self._owned:
+                self.sections[node] = copy.deepcopy(self.sections[node])
+                self._owned.add(node)
+            self.sections[node] = apply_ops(self.sections[node], copy.deepcopy(chunk["ops"]))
+
+    def section_message(self, node: str) -> dict[str, Any]:
+        """Full snapshot message of the current state of `node`."""
+        return {"event": "custom", "data": {"chunk_type": "structured", "current_node": node, "data": self.sections.get(node, {})}}
+
+    def catch_up_messages(self) -> list[dict[str, Any]]:
+        """Messages bringing a late joiner to the current state."""
+        messages: list[dict[str, Any]] = []
+        for node, status in self.node_status.items():
+            messages.append({"event": "custom", "data": {"chunk_type": "node_update", "current_node": node, "data": {"status": "started"}}})
+            if node in self.sections:
+                messages.append(self.section_message(node))
+            if status == "completed":
+                messages.append({"event": "custom", "data": {"chunk_type": "node_update", "current_node": node, "data": {"status": "completed"}}})
+        if self.final is not None:
+            messages.append(self.final)
+        return messages
+
+    def resync_message(self, node: str) -> dict[str, Any]:
+        """:meth:`section_message` for a client whose frames were collapsed."""
+        self.resynced[node] = self.seq
+        return self.section_message(node)
+
+    def missed_frames(self, seq: int) -> list[tuple[int, Any, str | None, str | None]] | None:
+        """Logged frames after `seq`, or ``None`` when they can't be replayed."""
+        if seq > self.seq:
+            return None
+        first = self.log[0][0] if self.log else self.seq + 1
+        if seq + 1 < first:
+            return None  # partly gone from the log
+        missed = [entry for entry in self.log if entry[0] > seq]
+        # A node resynced after `seq` is safe to replay from its next
+        # snapshot on, which replaces whatever state the client holds.
+        unsafe = {node for node, resynced in self.resynced.items() if resynced > seq}
+        for _, _, node, kind in missed:
+            if node in unsafe:
+                if kind == "patch":
+                    return None
+                if kind == "snapshot":
+                    unsafe.discard(node)
+        return missed
+
+
+class BroadcastHub:
+    """Registry of in-flight runs keyed by e.g. ``(linkedin_id, stream_format)``.
+
+    Parameters
+    ----------
+    encode:
+        Turns a message dict and its event id (or ``None``) into the frame
+        sent to subscribers.
+    buffer_size:
+        Per-connection :class:`FrameBuffer` size before frames are collapsed.
+    replay_size:
+        Live frames kept per run for clients resuming with a last event id.
+    linger:
+        Seconds a run keeps going after its last subscriber left, so a
+        reconnecting client can pick it up again.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[dict[str, Any], str | None], Any],
+        *,
+        buffer_size: int = 64,
+        replay_size: int = 0,
+        linger: float = 0.0,
+    ) -> None:
+        self.encode = encode
+        self.buffer_size = buffer_size
+        self.replay_size = replay_size
+        self.linger = linger
+        self.runs: dict[Hashable, BroadcastRun] = {}
+
+    def is_running(self, key: Hashable) -> bool:
+        return key in self.runs
+
+    @staticmethod
+    def parse_event_id(value: str | None) -> tuple[str, int] | None:
+        """``(run id, sequence number)`` of an event id, ``None`` if malformed."""
+        run_id, _, seq = (value or "").strip().rpartition(":")
+        if not run_id or not seq.isdigit():
+            return None
+        return run_id, int(seq)
+
+    async def _pump(self, run: BroadcastRun, source: AsyncIterator[dict[str, Any]]) -> None:
+        try:
+            async for message in source:
+                run.seq += 1
+                frame = self.encode(message, f"{run.run_id}:{run.seq}")
+                node, kind = _frame_tag(message)
+                run.log.append((run.seq, frame, node, kind))
+                for buffer in run.subscribers:
+                    buffer.put(frame, node, kind)
+                run.track(message)
+        except Exception as exc:  # the source should surface its own errors
+            logger.exception("Broadcast run %r failed", run.key)
+            frame = self.encode({"event": "error", "data": str(exc)}, None)
+            for buffer in run.subscribers:
+                buffer.put(frame)
+        finally:
+            self.runs.pop(run.key, None)
+            for buffer in run.subscribers:
+                buffer.put(_END)
+
+    async def subscribe(
+        self,
+        key: Hashable,
+        source_factory: Callable[[], AsyncIterator[dict[str, Any]]],
+        *,
+        is_disconnected: Callable[[], Awaitable[bool]] | None = None,
+        poll_interval: float = 1.0,
+        admit: Callable[[], Awaitable[Callable[[], None]]] | None = None,
+        on_join: Callable[[], None] | None = None,
+        run_id: str | None = None,
+        last_event_id: str | None = None,
+    ) -> AsyncIterator[Any]:
+        """Yield encoded frames of the run for `key`, starting it if needed.
+
+        When the consumer goes away (the response was cancelled, or
+        `is_disconnected` – polled whenever no frame arrived for
+        `poll_interval` seconds – returned ``True``) and it was the last
+        subscriber, the run is cancelled (``linger`` seconds later).
+
+        `admit` is awaited only when this call starts a new run (e.g. to take
+        an admission slot); it returns the callback called once that run has
+        finished or was cancelled, or raises to refuse the run. `on_join` is
+        called when an existing run is joined instead. `run_id` names a run
+        started by this call. With the `last_event_id` of a frame of the
+        running run, the client only gets the frames it missed.
+        """
+        run = self.runs.get(key)
+        on_run_done = None
+        if run is None and admit is not None:
+            on_run_done = await admit()
+            # Another subscriber may have started the run meanwhile.
+            run = self.runs.get(key)
+            if run is not None:
+                on_run_done()
+                on_run_done = None
+        created = run is None
+        if run is None:
+            run = BroadcastRun(key, run_id, self.replay_size)
+            self.runs[key] = run
+        elif on_join is not None:
+            on_join()
+        buffer = FrameBuffer(
+            self.buffer_size,
+            resync=lambda node: self.encode(run.resync_message(node), None),
+        )
+        # Catch-up frames are queued synchronously, before any new live frame.
+        resume = self.parse_event_id(last_event_id)
+        missed = run.missed_frames(resume[1]) if resume and resume[0] == run.run_id else None
+        if missed is not None:
+            for _, frame, node, kind in missed:
+                buffer.put(frame, node, kind)
+        else:
+            messages = run.catch_up_messages()
+            for i, message in enumerate(messages, 1):
+                # Only the last catch-up frame completes the state as of `run.seq`.
+                event_id = f"{run.run_id}:{run.seq}" if i == len(messages) else None
+                buffer.put(self.encode(message, event_id), *_frame_tag(message))
+        run.subscribers.add(buffer)
+        if created:
+            run.task = asyncio.create_task(self._pump(run, source_factory()))
+            if on_run_done is not None:
+                run.task.add_done_callback(lambda _: on_run_done())
+        try:
+            while True:
+                if is_disconnected is None:
+                    frame = await buffer.get()
+                else:
+                    try:
+                        frame = await asyncio.wait_for(buffer.get(), poll_interval)
+                    except asyncio.TimeoutError:
+                        if await is_disconnected():
+                            break
+                        continue
+                if frame is _END:
+                    break
+                yield frame
+        finally:
+            run.subscribers.discard(buffer)
+            if buffer.collapsed:
+                logger.debug("Collapsed %d frames for a slow client of %r", buffer.collapsed, key)
+            if not run.subscribers and run.task is not None and not run.task.done():
+                if self.linger:
+                    asyncio.get_running_loop().call_later(self.linger, self._cancel_if_idle, run)
+                else:
+                    self._cancel_if_idle(run)
+
+    @staticmethod
+    def _cancel_if_idle(run: BroadcastRun) -> None:
+        if not run.subscribers and run.task is not None and not run.task.done():
+            logger.info("Last client of %r disconnected, cancelling the run", run.key)
+            run.task.cancel()
+
+
+__all__ = ["FrameBuffer", "BroadcastRun", "BroadcastHub"]
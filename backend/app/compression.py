@@ -0,0 +1,132 @@
+"""Compression of streamed responses (``Content-Encoding: gzip`` / ``br``).
+
+Snapshot SSE frames repeat most of the previous frame, so a compressor that
+keeps its window across frames shrinks a stream many times over. Every frame
+is flushed on its own (``Z_SYNC_FLUSH`` / brotli ``flush()``), so the client
+can decode and render it as soon as it arrives instead of waiting for the
+compressor to fill a block.
+
+`brotli` is optional (``pip install portfolio-backend[brotli]``); without it
+only gzip is offered.
+"""
+
+from __future__ import annotations
+
+import os
+import zlib
+from typing import AsyncIterator, Protocol
+
+try:  # optional – better ratios than gzip at similar CPU cost
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+class FrameCompressor(Protocol):
+    def compress(self, frame: bytes) -> bytes:
+        """Compressed bytes of `frame`, flushed so the client can decode them."""
+
+    def finish(self) -> bytes:
+        """The end of the compressed stream."""
+
+
+class GzipFrameCompressor:
+    """gzip stream flushed after every frame."""
+
+    def __init__(self, level: int = 1) -> None:
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, frame: bytes) -> bytes:
+        return self._compressor.compress(frame) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliFrameCompressor:
+    """brotli stream flushed after every frame."""
+
+    def __init__(self, quality: int = 4) -> None:
+        if brotli is None:
+            raise RuntimeError("brotli is not installed")
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=quality)
+
+    def compress(self, frame: bytes) -> bytes:
+        return self._compressor.process(frame) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def available_encodings(preferred: tuple[str, ...]) -> tuple[str, ...]:
+    """`preferred` encodings this process can produce."""
+    return tuple(e for e in preferred if e == "gzip" or (e == "br" and brotli is not None))
+
+
+def negotiate_encoding(accept_encoding: str | None, offered: tuple[str, ...]) -> str | None:
+    """The first of `offered` the client accepts (``q`` > 0), or None.
+
+    ``*`` accepts everything not listed explicitly; ``identity`` and unknown
+    codings are ignored.
+    """
+    if not accept_encoding or not offered:
+        return None
+    qualities: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.strip().lower()] = quality
+    for encoding in offered:
+        if qualities.get(encoding, qualities.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def frame_compressor(encoding: str, level: int | None = None) -> FrameCompressor:
+    """A compressor for `encoding` (``"gzip"`` or ``"br"``) at `level`."""
+    if encoding == "gzip":
+        return GzipFrameCompressor(GZIP_LEVEL if level is None else level)
+    if encoding == "br":
+        return BrotliFrameCompressor(BROTLI_QUALITY if level is None else level)
+    raise ValueError(f"Unsupported encoding {encoding!r}")
+
+
+async def compress_frames(frames: AsyncIterator[bytes], compressor: FrameCompressor) -> AsyncIterator[bytes]:
+    """Compress `frames` one by one; the stream end is only written when they ran out."""
+    try:
+        async for frame in frames:
+            yield compressor.compress(frame)
+        yield compressor.finish()
+    finally:
+        await frames.aclose()
+
+
+# Encodings offered for /api/portfolio/stream, in order of preference
+# (STREAM_COMPRESSION="" disables compression), and their levels; see
+# `python -m benchmarks.compression` for bytes on the wire and CPU per level.
+STREAM_COMPRESSION = available_encodings(
+    tuple(e.strip() for e in os.getenv("STREAM_COMPRESSION", "br,gzip").split(",") if e.strip())
+)
+GZIP_LEVEL = int(os.getenv("STREAM_GZIP_LEVEL", "1"))
+BROTLI_QUALITY = int(os.getenv("STREAM_BROTLI_QUALITY", "4"))
+
+__all__ = [
+    "FrameCompressor",
+    "GzipFrameCompressor",
+    "BrotliFrameCompressor",
+    "available_encodings",
+    "negotiate_encoding",
+    "frame_compressor",
+    "compress_frames",
+    "STREAM_COMPRESSION",
+    "GZIP_LEVEL",
+    "BROTLI_QUALITY",
+]
@@ -1,86 +1,455 @@
-from fastapi import FastAPI
+import time
+
+_IMPORT_START = time.perf_counter()
+
+from fastapi import FastAPI, Header, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-from typing import TypedDict, Any
+from typing import Annotated, Any, AsyncIterator, Callable, NotRequired, TypedDict
+from pydantic import Field
 import json
-from pydantic import BaseModel
-from .agent.portfolio_graph import InputState, OutputState, graph
-from .agent.tools import to_jsonable
+import asyncio
+import math
+import os
+import uuid
+from .agent.portfolio_graph import InputState, OutputState, graph, resumable_graph, warm_up
+from .agent.tools import STREAM_FORMATS, DEFAULT_STREAM_FORMAT
+from .agent.serialization import dumps, sse_frame
+from .agent.http_client import HTTP_POOL
+from .agent.tools import PROFILE_CACHE, PROJECTS_CACHE, SECTION_CACHE
+from .agent.limits import ADMISSION, AdmissionRejected
+from .agent.metrics import (
+    ACTIVE_STREAMS,
+    REGISTRY,
+    STREAM_BYTES,
+    STREAM_DURATION,
+    STREAM_FRAMES,
+    STARTUP_SECONDS,
+    register_cache_metrics,
+)
+from .results import OUTPUT_KEYS, RESULT_STORE, replay_messages
+from .broadcast import BroadcastHub
+from .compression import STREAM_COMPRESSION, compress_frames, frame_compressor, negotiate_encoding
+from .resume import RESUMABLE_RUNS
+from contextlib import asynccontextmanager
 import logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+
+# When to do the deferred imports (the LLM client, see `warm_up`):
+#   lazy       – on first use, by the first request that needs them
+#   background – in a thread right after startup, while already serving
+#   eager      – before the app accepts requests
+STARTUP_MODES = ("lazy", "background", "eager")
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background")
+if STARTUP_MODE not in STARTUP_MODES:
+    raise ValueError(f"STARTUP_MODE must be one of {STARTUP_MODES}, got {STARTUP_MODE!r}")
+
+
+async def _timed_warm_up() -> None:
+    start = time.perf_counter()
+    await asyncio.to_thread(warm_up)
+    STARTUP_SECONDS.labels("warm_up").set(time.perf_counter() - start)
+    logger.info("Warm-up done in %.3fs", time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the shared upstream HTTP pool on startup and close it on shutdown."""
+    start = time.perf_counter()
+    await HTTP_POOL.start()
+    warm_up_task = None
+    if STARTUP_MODE == "eager":
+        await _timed_warm_up()
+    elif STARTUP_MODE == "background":
+        warm_up_task = asyncio.create_task(_timed_warm_up())
+    STARTUP_SECONDS.labels("lifespan").set(time.perf_counter() - start)
+    logger.info(
+        "Started in %.3fs (import %.3fs, startup mode %s)",
+        time.perf_counter() - _IMPORT_START,
+        IMPORT_SECONDS,
+        STARTUP_MODE,
+    )
+    try:
+        yield
+    finally:
+        if warm_up_task is not None:
+            await warm_up_task
+        await HTTP_POOL.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Frame coalescing for stream_state: one frame per ~33 ms of pacing, cut at
+# word boundaries. Set STREAM_FRAME_INTERVAL=0 for one frame per mutation.
+STREAM_FRAME_INTERVAL = float(os.getenv("STREAM_FRAME_INTERVAL", "0.033"))
+STREAM_FRAME_BOUNDARY = os.getenv("STREAM_FRAME_BOUNDARY", "word")
+
+
+def _bypass_result_store(cache_control: str | None) -> bool:
+    """``Cache-Control: no-cache`` forces a fresh graph run."""
+    return bool(cache_control) and "no-cache" in cache_control.lower()
+
+
+# Concurrent streams of the same profile + format share one graph run; each
+# connection buffers at most STREAM_CLIENT_BUFFER frames before collapsing.
+# The last STREAM_REPLAY_FRAMES frames of a run are kept for reconnects, and a
+# run nobody listens to anymore is cancelled after STREAM_RESUME_GRACE seconds.
+STREAM_HUB = BroadcastHub(
+    encode=sse_frame,
+    buffer_size=int(os.getenv("STREAM_CLIENT_BUFFER", "64")),
+    replay_size=int(os.getenv("STREAM_REPLAY_FRAMES", "512")),
+    linger=float(os.getenv("STREAM_RESUME_GRACE", "15")),
+)
+
+# Ids per /api/portfolio/batch request, and graph runs in flight per batch.
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+register_cache_metrics(
+    {"profile": PROFILE_CACHE, "projects": PROJECTS_CACHE, "section": SECTION_CACHE, "result": RESULT_STORE.cache}
+)
+
+
+async def _metered(frames: AsyncIterator[bytes], source: str) -> AsyncIterator[bytes]:
+    """Pass SSE frames through, recording stream metrics once at the end."""
+    ACTIVE_STREAMS.inc()
+    start = time.perf_counter()
+    count = nbytes = 0
+    try:
+        async for frame in frames:
+            count += 1
+            nbytes += len(frame)
+            yield frame
+    finally:
+        ACTIVE_STREAMS.dec()
+        STREAM_FRAMES.labels(source).observe(count)
+        STREAM_BYTES.labels(source).observe(nbytes)
+        STREAM_DURATION.labels(source).observe(time.perf_counter() - start)
+        await frames.aclose()
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """:class:`StreamingResponse` that calls `on_close` once it is over – sent,
+    failed or cancelled, even if its body was never iterated."""
+
+    def __init__(self, *args: Any, on_close: Callable[[], None], **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+def _event_stream(
+    frames: AsyncIterator[bytes],
+    source: str,
+    headers: dict[str, str],
+    accept_encoding: str | None,
+    on_close: Callable[[], None] | None = None,
+):
+    """SSE response of `frames`, compressed frame by frame when the client accepts it."""
+    headers = {**headers, "Vary": "Accept-Encoding"}
+    encoding = negotiate_encoding(accept_encoding, STREAM_COMPRESSION)
+    if encoding is not None:
+        frames = compress_frames(frames, frame_compressor(encoding))
+        headers["Content-Encoding"] = encoding
+    # ``media_type`` **must** be text/event-stream for SSE
+    if on_close is not None:
+        return _ClosingStreamingResponse(
+            _metered(frames, source), media_type="text/event-stream", headers=headers, on_close=on_close
+        )
+    return StreamingResponse(_metered(frames, source), media_type="text/event-stream", headers=headers)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected) -> JSONResponse:
+    """Too many graph runs in flight: ask the client to come back later."""
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=503,
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """Prometheus text exposition of the app metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 # Example API that triggers the graph
 @app.post("/api/portfolio")
-async def run_portfolio(input: InputState) -> OutputState:
+async def run_portfolio(
+    input: InputState,
+    cache_control: str | None = Header(default=None),
+) -> OutputState:
     """Runs the graph **without** streaming and returns the final OutputState.
-    Kept for backward-compatibility. Prefer using /api/portfolio/stream for real-time updates."""
-
-    result: OutputState | None = None
-    async for event_type, payload in graph.astream(input, stream_mode=["custom", "values"]):
-        if event_type == "custom":
-            logger.debug(payload)  # already JSON-serialisable
-        elif event_type == "values":
-            result = payload  # type: ignore[assignment]
-        else:
-            logger.debug(event_type, payload)
-
-    # logger.debug("RESULT:", json.dumps(to_jsonable(result), indent=2, ensure_ascii=False))
+    Kept for backward-compatibility. Prefer using /api/portfolio/stream for real-time updates.
+
+    Finished runs are served from the result store unless the request carries
+    ``Cache-Control: no-cache``."""
+
+    if not _bypass_result_store(cache_control):
+        stored = await RESULT_STORE.get(input["linkedin_id"])
+        if stored is not None:
+            return stored["output"]  # type: ignore[return-value]
+
+    return await _run_to_completion(input)
+
+
+# Nobody watches the sections of non-streaming runs: skip their emission and pacing.
+NON_STREAMING_CONFIG = {"configurable": {"stream_sections": False}}
+
+
+async def _run_to_completion(input: InputState, *, patient: bool = False) -> OutputState:
+    """Run the graph for its final state only (admitted by ``ADMISSION``, see
+    :meth:`Limiter.acquire` for `patient`) and store found portfolios in the
+    result store."""
+    result: dict[str, Any] | None = None
+    async with ADMISSION.slot(patient=patient):
+        async for payload in graph.astream(input, NON_STREAMING_CONFIG, stream_mode="values"):
+            result = payload
+
     assert result is not None, "Graph did not yield a final OutputState"
-    return result
+    # The final state still holds the profile: keep the output keys only.
+    output: OutputState = {k: result[k] for k in OUTPUT_KEYS if k in result}  # type: ignore[assignment]
+    if output.get("linkedin_status") == "found":
+        await RESULT_STORE.put(input["linkedin_id"], output)
+    return output
+
+
+class BatchInput(TypedDict):
+    linkedin_ids: Annotated[list[str], Field(min_length=1, max_length=BATCH_MAX_IDS)]
+    # Graph runs of this batch in flight at once (capped at BATCH_CONCURRENCY).
+    concurrency: NotRequired[Annotated[int, Field(ge=1)]]
+
+
+@app.post("/api/portfolio/batch")
+async def run_portfolio_batch(
+    input: BatchInput,
+    cache_control: str | None = Header(default=None),
+):
+    """Generate the portfolios of many LinkedIn ids, streamed back as NDJSON.
+
+    Each line is ``{"linkedin_id": ..., "output": OutputState}`` (or
+    ``{"linkedin_id": ..., "error": "..."}``), written as soon as that
+    portfolio is done – so in completion order, not request order. Duplicate
+    ids are run once.
+
+    At most ``concurrency`` graph runs of the batch are in flight, each also
+    admitted by ``ADMISSION`` like any other run – but waiting for a slot as
+    long as it takes rather than ``ADMISSION_MAX_WAIT`` – and none of them
+    streams or paces its sections. Ids rejected because the admission queue
+    is full get ``{"linkedin_id": ..., "error": "...", "rejected": true,
+    "retry_after": seconds}`` instead of a run. Stored results are reused unless the request carries
+    ``Cache-Control: no-cache``.
+    """
+    linkedin_ids = list(dict.fromkeys(input["linkedin_ids"]))
+    concurrency = min(input.get("concurrency", BATCH_CONCURRENCY), BATCH_CONCURRENCY)
+    bypass = _bypass_result_store(cache_control)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def portfolio(linkedin_id: str) -> dict[str, Any]:
+        stored = None if bypass else await RESULT_STORE.get(linkedin_id)
+        if stored is not None:
+            return {"linkedin_id": linkedin_id, "output": stored["output"]}
+        async with semaphore:
+            try:
+                output = await _run_to_completion({"linkedin_id": linkedin_id}, patient=True)
+            except AdmissionRejected as exc:
+                logger.info("Batch run for %s rejected: %s", linkedin_id, exc)
+                return {"linkedin_id": linkedin_id, "error": str(exc), "rejected": True, "retry_after": exc.retry_after}
+            except Exception as exc:
+                logger.warning("Batch run for %s failed: %s", linkedin_id, exc)
+                return {"linkedin_id": linkedin_id, "error": str(exc)}
+        return {"linkedin_id": linkedin_id, "output": output}
+
+    async def lines() -> AsyncIterator[bytes]:
+        tasks = [asyncio.create_task(portfolio(linkedin_id)) for linkedin_id in linkedin_ids]
+        try:
+            for done in asyncio.as_completed(tasks):
+                yield dumps(await done) + b"\n"
+        finally:
+            # Client gone: don't keep generating portfolios nobody reads.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.delete("/api/portfolio/{linkedin_id}", status_code=204)
+async def invalidate_portfolio(linkedin_id: str) -> Response:
+    """Drop the stored result and cached profile so the next visit regenerates it."""
+    await RESULT_STORE.invalidate(linkedin_id)
+    await PROFILE_CACHE.invalidate(linkedin_id)
+    return Response(status_code=204)
 
 
 @app.post("/api/portfolio/stream")
-async def run_portfolio_stream(input: InputState):
+async def run_portfolio_stream(
+    input: InputState,
+    request: Request,
+    x_stream_format: str | None = Header(default=None),
+    cache_control: str | None = Header(default=None),
+    last_event_id: str | None = Header(default=None),
+    accept_encoding: str | None = Header(default=None),
+):
     """Stream graph events to the client using Server-Sent Events (SSE).
 
     The response is a **text/event-stream** where each event line contains a JSON
     object with two keys:
     - ``event``: the graph event type (e.g. "custom" or "values")
     - ``data``: the actual payload, converted to plain JSON-serialisable data
+
+    Clients may send ``X-Stream-Format: delta`` to receive ``patch`` chunks
+    instead of full snapshots for every step; the format actually used is
+    echoed back in the ``X-Stream-Format`` response header.
+
+    Finished runs are replayed from the result store without invoking the
+    graph (``X-Result-Store: hit``) unless the request carries
+    ``Cache-Control: no-cache``.
+
+    Graph runs are admitted by ``ADMISSION``: when too many are in flight the
+    request waits in a bounded queue, or gets a 503 with ``Retry-After``.
+    Joining a run already in progress needs no admission.
+
+    Each connection reads from a bounded buffer: a client that falls behind
+    gets the latest snapshot of a section instead of every intermediate
+    frame, and the run is cancelled once no client is listening anymore
+    (after a grace period of ``STREAM_RESUME_GRACE`` seconds).
+
+    Every frame carries an SSE ``id``. A client that reconnects with
+    ``Last-Event-ID`` gets only the frames it missed while the run is still
+    going; once the run was cancelled, it is resumed from its last
+    checkpoint (see :mod:`app.resume`) rather than started over.
+
+    The stream is compressed (``br`` or ``gzip``, see ``STREAM_COMPRESSION``)
+    when ``Accept-Encoding`` allows it, flushing every frame.
     """
 
-    from fastapi.responses import StreamingResponse  # local import to avoid unnecessary dependency if not used
-    result: OutputState | None = None
-    async def event_generator():
-        """Async generator that yields Server-Sent Events lines."""
+    stream_format = x_stream_format if x_stream_format in STREAM_FORMATS else DEFAULT_STREAM_FORMAT
+    linkedin_id = input["linkedin_id"]
+
+    stored = None if _bypass_result_store(cache_control) else await RESULT_STORE.get(linkedin_id)
+    if stored is not None:
+        async def replay_generator():
+            for message in replay_messages(stored, stream_format):
+                yield sse_frame(message)
+
+        return _event_stream(
+            replay_generator(),
+            "replay",
+            {"X-Stream-Format": stream_format, "X-Result-Store": "hit"},
+            accept_encoding,
+        )
+
+    config = {
+        "configurable": {
+            "stream_format": stream_format,
+            "frame_interval": STREAM_FRAME_INTERVAL,
+            "frame_boundary": STREAM_FRAME_BOUNDARY,
+        }
+    }
+
+    stream_key = (linkedin_id, stream_format)
+    run_id = uuid.uuid4().hex[:16]
+
+    async def graph_messages():
+        """Run the graph and yield SSE messages, ending with values or error."""
+        # Only called when this request starts the run: a Last-Event-ID of a
+        # run that is gone since continues its thread from the checkpoint.
+        thread_id = None
+        previous_run = STREAM_HUB.parse_event_id(last_event_id)
+        if previous_run is not None:
+            thread_id = RESUMABLE_RUNS.thread_for(previous_run[0], stream_key)
+        resuming = thread_id is not None
+        thread_id = thread_id or uuid.uuid4().hex
+        config["configurable"]["thread_id"] = thread_id
+        result: dict[str, Any] | None = None
+        # A resumed thread continues from its checkpoint (input None); the
+        # frames streamed before the interruption are not recorded again.
+        recorded: list[dict[str, Any]] | None = [] if RESULT_STORE.record_events and not resuming else None
+        RESUMABLE_RUNS.register(run_id, thread_id, stream_key)
         try:
-            async for event_type, payload in graph.astream(input, stream_mode=["custom", "values"]):
-                # Convert payload so it can be serialised to JSON
-                try:
-                    if isinstance(payload, str):
-                        # Attempt to de-JSONify strings for consistency
-                        try:
-                            payload_jsonable = json.loads(payload)
-                        except json.JSONDecodeError:
-                            payload_jsonable = payload
-                    elif isinstance(payload, BaseModel):
-                        payload_jsonable = payload.model_dump()
-                    else:
-                        payload_jsonable = to_jsonable(payload)
-                except Exception:
-                    # Never break the stream on serialisation issues
-                    payload_jsonable = str(payload)
-
-                message_dict = {"event": event_type, "data": payload_jsonable}
+            graph_input = None if resuming else input
+            async for event_type, payload in resumable_graph.astream(graph_input, config, stream_mode=["custom", "values"]):
+                # Custom chunks are already JSON data; values hold Pydantic
+                # models, which the encoder dumps when the frame is built.
+                message_dict = {"event": event_type, "data": payload}
                 if event_type == "custom":
-                    yield f"data: {json.dumps(message_dict, ensure_ascii=False)}\n\n"
+                    if recorded is not None:
+                        recorded.append(message_dict)
+                    yield message_dict
                 elif event_type == "values":
                     # Hold on to final snapshot; still echo intermediates if desired
-                    nonlocal result
                     result = message_dict
 
             # Emit the final values event once the graph completes
-            yield f"data: {json.dumps(result, ensure_ascii=False)}\n\n"
+            yield result
+            if result and isinstance(result["data"], dict) and result["data"].get("linkedin_status") == "found":
+                await RESULT_STORE.put(linkedin_id, result["data"], stream_format=stream_format, events=recorded)
+            RESUMABLE_RUNS.finish(thread_id)
         except Exception as exc:
             # Surface backend errors to the client rather than closing the socket silently
-            error_payload = {"event": "error", "data": str(exc)}
-            yield f"data: {json.dumps(error_payload, ensure_ascii=False)}\n\n"
-    # ``media_type`` **must** be text/event-stream for SSE
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+            yield {"event": "error", "data": str(exc)}
+
+    # Likely to start a run: raises AdmissionRejected (→ 503) before any byte
+    # is streamed. Whether the run is started is only decided when the stream
+    # subscribes: the hub then takes this ticket over (or admits the run now,
+    # if it ended in the meantime) and releases it when the run ends. A
+    # request that joins a run instead, or never subscribes, gives it back.
+    ticket = None if STREAM_HUB.is_running(stream_key) else await ADMISSION.acquire()
+
+    def release_ticket() -> None:
+        nonlocal ticket
+        if ticket is not None:
+            ticket.release()
+            ticket = None
+
+    async def admit() -> Callable[[], None]:
+        nonlocal ticket
+        admitted = ticket if ticket is not None else await ADMISSION.acquire()
+        ticket = None
+        return admitted.release
+
+    async def event_generator():
+        """Async generator that yields Server-Sent Events lines."""
+        frames = STREAM_HUB.subscribe(
+            stream_key,
+            graph_messages,
+            is_disconnected=request.is_disconnected,
+            admit=admit,
+            on_join=release_ticket,
+            run_id=run_id,
+            last_event_id=last_event_id,
+        )
+        try:
+            async for frame in frames:
+                yield frame
+        except AdmissionRejected as exc:
+            # The run seen at request time ended, and no slot is free for a new one.
+            yield sse_frame({"event": "error", "data": str(exc)})
+        finally:
+            await frames.aclose()
+
+    try:
+        return _event_stream(
+            event_generator(),
+            "graph",
+            {"X-Stream-Format": stream_format, "X-Result-Store": "miss"},
+            accept_encoding,
+            on_close=release_ticket,
+        )
+    except BaseException:
+        release_ticket()
+        raise
 
 # -------------------- Static React build --------------------
 # Mount **after** API routes so it never intercepts /api/* POST requests
@@ -88,3 +457,6 @@ static_path = Path(__file__).parent / "static"
 if static_path.exists():  # <── dev safety
     app.mount("/", StaticFiles(directory=static_path, html=True), name="site")
 
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
+STARTUP_SECONDS.labels("import").set(IMPORT_SECONDS)
@@ -0,0 +1,104 @@
+"""Store of finished portfolio runs.
+
+Once a portfolio for a `linkedin_id` has been generated, repeat visits are
+served from here instead of re-running the graph: `/api/portfolio` returns the
+stored `OutputState`, `/api/portfolio/stream` replays the recorded custom
+events (or, when none were recorded for the requested format, one snapshot per
+section) followed by the final values event.
+
+Entries expire after ``RESULT_STORE_MAX_AGE`` seconds and can be dropped
+explicitly with ``DELETE /api/portfolio/{linkedin_id}``.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Iterator, TypedDict
+
+from .agent.cache import MISSING, TTLCache, make_store
+from .agent.serialization import to_jsonable
+
+# OutputState key → node name used in the custom events of that section.
+SECTION_NODES = {
+    "about_data": "about_node",
+    "projects_data": "projects_node",
+    "experience_data": "experience_node",
+}
+OUTPUT_KEYS = (*SECTION_NODES, "linkedin_status")
+
+
+class StoredResult(TypedDict):
+    output: dict[str, Any]
+    # stream format → recorded SSE messages ({"event": ..., "data": ...})
+    events: dict[str, list[dict[str, Any]]]
+
+
+class ResultStore:
+    """Finished runs keyed by `linkedin_id` (see module docstring)."""
+
+    def __init__(self, cache: TTLCache[StoredResult], *, record_events: bool = False) -> None:
+        self.cache = cache
+        self.record_events = record_events
+
+    async def get(self, linkedin_id: str) -> StoredResult | None:
+        stored = await self.cache.get(linkedin_id)
+        return None if stored is MISSING else stored
+
+    async def put(
+        self,
+        linkedin_id: str,
+        output: dict[str, Any],
+        *,
+        stream_format: str | None = None,
+        events: list[dict[str, Any]] | None = None,
+    ) -> None:
+        """Store `output` (only ``OutputState`` keys are kept) and, when
+        recording is enabled, the custom events streamed in `stream_format`."""
+        output = {k: to_jsonable(output[k]) for k in OUTPUT_KEYS if k in output}
+        existing = await self.cache.peek(linkedin_id)
+        existing = None if existing is MISSING else existing
+        stored: StoredResult = {
+            "output": output,
+            # Events recorded for other formats stay valid only if the output is unchanged
+            "events": dict(existing["events"]) if existing and existing["output"] == output else {},
+        }
+        if self.record_events and stream_format and events is not None:
+            stored["events"][stream_format] = events
+        await self.cache.set(linkedin_id, stored)
+
+    async def invalidate(self, linkedin_id: str) -> None:
+        await self.cache.invalidate(linkedin_id)
+
+
+def replay_messages(stored: StoredResult, stream_format: str) -> Iterator[dict[str, Any]]:
+    """SSE messages reproducing a finished run, ending with the values event."""
+    events = stored["events"].get(stream_format)
+    if events is not None:
+        yield from events
+    else:
+        # Full snapshots are valid in every stream format
+        for key, node in SECTION_NODES.items():
+            if key not in stored["output"]:
+                continue
+            yield {"event": "custom", "data": {"chunk_type": "node_update", "current_node": node, "data": {"status": "started"}}}
+            yield {"event": "custom", "data": {"chunk_type": "structured", "current_node": node, "data": stored["output"][key]}}
+            yield {"event": "custom", "data": {"chunk_type": "node_update", "current_node": node, "data": {"status": "completed"}}}
+    yield {"event": "values", "data": stored["output"]}
+
+
+RESULT_STORE = ResultStore(
+    TTLCache(
+        maxsize=int(os.getenv("RESULT_STORE_SIZE", "256")),
+        ttl=float(os.getenv("RESULT_STORE_MAX_AGE", str(24 * 60 * 60))),
+        store=make_store(
+            os.getenv("RESULT_STORE"),
+            os.getenv("RESULT_STORE_PATH"),
+            table="portfolio_results",
+            maxsize=int(os.getenv("RESULT_STORE_SIZE", "256")),
+        ),
+        name="result store",
+    ),
+    record_events=os.getenv("RESULT_STORE_EVENTS", "0") in ("1", "true", "True"),
+)
+
+__all__ = ["StoredResult", "ResultStore", "replay_messages", "RESULT_STORE"]
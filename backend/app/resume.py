@@ -0,0 +1,119 @@
+"""Resuming interrupted portfolio streams.
+
+Stream runs use `resumable_graph`, which checkpoints every finished node
+under the run's thread id. When a client loses its connection and nobody else
+is watching, the run is cancelled; a reconnect carrying the ``Last-Event-ID``
+of that run continues its thread from the last checkpoint instead of starting
+over, so the profile is not scraped and finished sections are not generated
+again.
+
+:class:`ResumableRuns` maps the run ids found in event ids to their thread
+and stream key, and drops the checkpoints of threads that finished or
+expired – on a timer, so the threads of failed or abandoned runs are freed
+even when no further streams are started.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from .agent.portfolio_graph import CHECKPOINTER
+
+logger = logging.getLogger(__name__)
+
+
+class ResumableRuns:
+    """Run id → (thread id, stream key) of recent stream runs.
+
+    Parameters
+    ----------
+    checkpointer:
+        The LangGraph checkpointer holding the threads.
+    ttl:
+        Seconds an interrupted run stays resumable.
+    maxsize:
+        Maximum number of runs kept; the oldest are dropped first.
+    """
+
+    def __init__(self, checkpointer: Any, *, ttl: float, maxsize: int) -> None:
+        self.checkpointer = checkpointer
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._runs: OrderedDict[str, tuple[str, Hashable, float]] = OrderedDict()
+        self._timer: asyncio.TimerHandle | None = None
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def register(self, run_id: str, thread_id: str, key: Hashable) -> None:
+        self._runs[run_id] = (thread_id, key, time.monotonic())
+        self.prune()
+
+    def thread_for(self, run_id: str, key: Hashable) -> str | None:
+        """Thread of run `run_id` if it can be resumed for stream `key`."""
+        self.prune()
+        entry = self._runs.get(run_id)
+        if entry is None or entry[1] != key or time.monotonic() - entry[2] > self.ttl:
+            return None
+        thread_id = entry[0]
+        if self.checkpointer.get_tuple({"configurable": {"thread_id": thread_id}}) is None:
+            return None
+        return thread_id
+
+    def finish(self, thread_id: str) -> None:
+        """Drop the checkpoints of a thread that ran to completion."""
+        for run_id in [run_id for run_id, entry in self._runs.items() if entry[0] == thread_id]:
+            del self._runs[run_id]
+        self.checkpointer.delete_thread(thread_id)
+        self.prune()
+
+    def prune(self) -> None:
+        """Forget expired runs (and the overflow) and delete their threads."""
+        now = time.monotonic()
+        dropped: set[str] = set()
+        while self._runs:
+            run_id, (thread_id, _, created) = next(iter(self._runs.items()))
+            if len(self._runs) <= self.maxsize and now - created <= self.ttl:
+                break
+            del self._runs[run_id]
+            dropped.add(thread_id)
+        # A thread resumed by a later run is still referenced by it.
+        live = {thread_id for thread_id, _, _ in self._runs.values()}
+        for thread_id in dropped - live:
+            self.checkpointer.delete_thread(thread_id)
+        if dropped:
+            logger.debug("Dropped %d expired resumable threads", len(dropped - live))
+        self._schedule_prune()
+
+    def _schedule_prune(self) -> None:
+        """Prune again when the oldest run expires (one timer at a time)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._runs:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:  # not called from the server: the next call prunes
+            return
+        created = next(iter(self._runs.values()))[2]
+        delay = max(created + self.ttl - time.monotonic(), 0.0) + 0.1
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self.prune()
+
+
+RESUMABLE_RUNS = ResumableRuns(
+    CHECKPOINTER,
+    ttl=float(os.getenv("STREAM_RESUME_TTL", str(10 * 60))),
+    maxsize=int(os.getenv("STREAM_RESUME_RUNS", "1024")),
+)
+
+__all__ = ["ResumableRuns", "RESUMABLE_RUNS"]
@@ -0,0 +1,131 @@
+"""Run the benchmark suite and compare it against the stored baselines.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks                  # run + compare, exit 1 on regression
+    python -m benchmarks -k stream_state  # only benchmarks whose name contains it
+    python -m benchmarks --save           # (re)write baselines.json
+
+Counters returned by a benchmark (frames / bytes emitted) are deterministic:
+any increase over the baseline is a regression. CPU time (median
+``time.process_time`` of repeated runs) is machine dependent, so it only
+regresses beyond ``--tolerance`` × the baseline; re-save the baselines when
+moving to another machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any
+
+from app.agent.serialization import ENCODER
+
+from .suite import BENCHMARKS, BenchmarkFn, prepare
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+
+def run_once(fn: BenchmarkFn, loop: asyncio.AbstractEventLoop) -> tuple[float, dict[str, int]]:
+    start = time.process_time()
+    result = fn()
+    if inspect.isawaitable(result):
+        result = loop.run_until_complete(result)
+    return time.process_time() - start, result
+
+
+def measure(fn: BenchmarkFn, loop: asyncio.AbstractEventLoop, min_time: float, max_repeat: int) -> dict[str, Any]:
+    """Median CPU time of repeated runs (at least `min_time` seconds in total)."""
+    run_once(fn, loop)  # warm-up
+    timings: list[float] = []
+    counters: dict[str, int] = {}
+    while len(timings) < 3 or (sum(timings) < min_time and len(timings) < max_repeat):
+        elapsed, counters = run_once(fn, loop)
+        timings.append(elapsed)
+    return {"cpu_ms": round(1000 * statistics.median(timings), 4), "runs": len(timings), **counters}
+
+
+def compare(name: str, result: dict[str, Any], baseline: dict[str, Any] | None, tolerance: float) -> list[str]:
+    """Regressions of `result` against `baseline`."""
+    if baseline is None:
+        return []
+    problems = []
+    for key, value in result.items():
+        if key in ("cpu_ms", "runs") or key not in baseline:
+            continue
+        if value > baseline[key]:
+            problems.append(f"{name}: {key} {baseline[key]} -> {value}")
+    if result["cpu_ms"] > tolerance * baseline["cpu_ms"]:
+        problems.append(f"{name}: cpu {baseline['cpu_ms']:.3f} -> {result['cpu_ms']:.3f} ms (> {tolerance:g}x)")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("-k", dest="keyword", help="only run benchmarks whose name contains KEYWORD")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baselines")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed CPU time ratio (default 1.5)")
+    parser.add_argument("--min-time", type=float, default=0.5, help="CPU seconds to spend per benchmark")
+    parser.add_argument("--max-repeat", type=int, default=200, help="maximum timed runs per benchmark")
+    parser.add_argument("--baselines", default=BASELINES_PATH, help="baselines file")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # the app modules log every request at DEBUG/INFO
+    try:
+        with open(args.baselines) as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        stored = {"benchmarks": {}}
+    baselines: dict[str, Any] = stored.get("benchmarks", {})
+    if stored.get("encoder", ENCODER) != ENCODER:
+        print(f"warning: baselines were recorded with {stored['encoder']}, running with {ENCODER}", file=sys.stderr)
+
+    prepare()
+    loop = asyncio.new_event_loop()
+    results: dict[str, dict[str, Any]] = {}
+    regressions: list[str] = []
+    print(f"{'benchmark':<52}{'cpu ms':>10}{'baseline':>10}{'frames':>9}{'bytes':>11}")
+    try:
+        for name, fn in BENCHMARKS.items():
+            if args.keyword and args.keyword not in name:
+                continue
+            result = measure(fn, loop, args.min_time, args.max_repeat)
+            results[name] = result
+            baseline = baselines.get(name)
+            regressions += compare(name, result, baseline, args.tolerance)
+            print(
+                f"{name:<52}{result['cpu_ms']:>10.3f}"
+                f"{baseline['cpu_ms'] if baseline else float('nan'):>10.3f}"
+                f"{result.get('frames', ''):>9}{result.get('bytes', ''):>11}"
+            )
+    finally:
+        loop.close()
+
+    if args.save:
+        stored = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "encoder": ENCODER,
+            "benchmarks": {**baselines, **results},
+        }
+        with open(args.baselines, "w") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baselines written to {args.baselines}")
+        return 0
+
+    for problem in regressions:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""Cold-start benchmark: process start to first streamed byte.
+
+Starts ``uvicorn app.main:app`` in a fresh process (as a scaled-to-zero Fly
+machine does on its first request) against the ProAPIS / OpenAI stand-ins of
+:mod:`loadtest.fakes`, sends ``POST /api/portfolio/stream`` as soon as the
+port accepts connections and records, in seconds since the process was
+spawned:
+
+- ``listening`` – the port accepts connections,
+- ``first_byte`` – first byte of the stream (the budget applies to this),
+- ``projects`` – first frame of projects data (needs the LLM client),
+- ``done`` – end of the stream,
+
+plus the app's own ``portfolio_startup_seconds`` phases. Each ``STARTUP_MODE``
+is measured ``--repeat`` times and the medians are reported; the exit status
+is 1 when a median ``first_byte`` exceeds ``--budget``.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.cold_start [--modes lazy background eager] [--repeat 5] [--budget 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+from typing import Any
+
+import aiohttp
+
+from loadtest.fakes import FakeConfig, serve
+from loadtest.sse import frame_message
+
+HOST = "127.0.0.1"
+PHASES = ("listening", "first_byte", "projects", "done")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def is_projects_content(frame: bytes) -> bool:
+    """Whether an SSE frame carries projects data (not just a status update)."""
+    message = frame_message(frame)
+    if message is None:
+        return False
+    data = message.get("data")
+    return (
+        isinstance(data, dict)
+        and data.get("current_node") == "projects_node"
+        and data.get("chunk_type") != "node_update"
+    )
+
+
+def parse_startup_metrics(text: str) -> dict[str, float]:
+    """``portfolio_startup_seconds{phase=...}`` samples of a /metrics page."""
+    phases = {}
+    for line in text.splitlines():
+        if line.startswith('portfolio_startup_seconds{phase="'):
+            labels, value = line.rsplit(" ", 1)
+            phases[labels.split('"')[1]] = float(value)
+    return phases
+
+
+async def cold_start(mode: str, env: dict[str, str], timeout: float) -> dict[str, float]:
+    port = free_port()
+    base_url = f"http://{HOST}:{port}"
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "app.main:app", "--host", HOST, "--port", str(port), "--log-level", "warning",
+        env={**env, "STARTUP_MODE": mode},
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    timings: dict[str, float] = {}
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+            while True:
+                if process.returncode is not None or time.perf_counter() - start > timeout:
+                    raise RuntimeError(f"app did not start (mode {mode})")
+                try:
+                    _, writer = await asyncio.open_connection(HOST, port)
+                except OSError:
+                    await asyncio.sleep(0.005)
+                    continue
+                writer.close()
+                break
+            timings["listening"] = time.perf_counter() - start
+
+            body = {"linkedin_id": f"cold-start-{port}"}
+            async with session.post(f"{base_url}/api/portfolio/stream", json=body) as resp:
+                resp.raise_for_status()
+                buffer = b""
+                async for chunk in resp.content.iter_any():
+                    now = time.perf_counter() - start
+                    timings.setdefault("first_byte", now)
+                    buffer += chunk
+                    *frames, buffer = buffer.split(b"\n\n")
+                    for frame in frames:
+                        if "projects" not in timings and is_projects_content(frame):
+                            timings["projects"] = now
+            timings["done"] = time.perf_counter() - start
+
+            async with session.get(f"{base_url}/metrics") as resp:
+                timings.update(parse_startup_metrics(await resp.text()))
+    finally:
+        if process.returncode is None:
+            process.terminate()
+        await process.wait()
+    return timings
+
+
+async def run(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    proapis_port, openai_port = free_port(), free_port()
+    config = FakeConfig(proapis_latency=args.upstream_latency, llm_ttft=args.upstream_latency, llm_token_rate=2000.0)
+    runners = await serve(config, HOST, proapis_port, openai_port)
+    env = {
+        **os.environ,
+        "PROAPIS_KEY": "fake",
+        "PROAPIS_BASE_URL": f"http://{HOST}:{proapis_port}",
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"http://{HOST}:{openai_port}/v1",
+    }
+    results: dict[str, dict[str, float]] = {}
+    try:
+        for mode in args.modes:
+            runs = [await cold_start(mode, env, args.timeout) for _ in range(args.repeat)]
+            keys = dict.fromkeys(key for timings in runs for key in timings)
+            results[mode] = {key: statistics.median(t[key] for t in runs if key in t) for key in keys}
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure cold start to first streamed byte.")
+    parser.add_argument("--modes", nargs="+", choices=("lazy", "background", "eager"), default=["lazy", "background"])
+    parser.add_argument("--repeat", type=int, default=5, help="cold starts per mode")
+    parser.add_argument("--budget", type=float, default=3.0, help="allowed median seconds to first byte")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="stand-in ProAPIS / LLM latency")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds per cold start")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    startup_phases = sorted({key for timings in results.values() for key in timings} - set(PHASES))
+    columns: list[Any] = [*PHASES, *startup_phases]
+    print(f"{'mode (median s)':<16}" + "".join(f"{c:>12}" for c in columns))
+    failed = False
+    for mode, timings in results.items():
+        print(f"{mode:<16}" + "".join(f"{timings.get(c, float('nan')):>12.3f}" for c in columns))
+        if timings["first_byte"] > args.budget:
+            print(f"OVER BUDGET {mode}: first byte {timings['first_byte']:.3f}s > {args.budget:g}s", file=sys.stderr)
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""SSE compression benchmark: bytes on the wire and CPU per request.
+
+Compresses the frames of a whole ``/api/portfolio/stream`` request (about,
+experience and projects sections, see :func:`.suite.request_frames`) the way
+the endpoint does – one compressor per response, flushed after every frame –
+for each stream format, encoding and level, and reports:
+
+- ``bytes`` – bytes on the wire, and ``ratio`` to the uncompressed stream,
+- ``flush B/frame`` – average compressed bytes per frame (what a client
+  receives per render),
+- ``cpu ms`` – median CPU time to compress the request.
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.compression [--gzip-levels 1 6 9] [--brotli-qualities 1 4 6 11] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import statistics
+import time
+
+from app.agent import tools
+from app.compression import available_encodings, frame_compressor
+
+from .suite import prepare, request_frames
+
+
+def measure(frames: list[bytes], encoding: str | None, level: int, repeat: int) -> dict[str, float]:
+    timings = []
+    nbytes = 0
+    for _ in range(repeat):
+        start = time.process_time()
+        if encoding is None:
+            nbytes = sum(len(frame) for frame in frames)
+        else:
+            compressor = frame_compressor(encoding, level)
+            nbytes = sum(len(compressor.compress(frame)) for frame in frames) + len(compressor.finish())
+        timings.append(time.process_time() - start)
+    return {"bytes": nbytes, "cpu_ms": statistics.median(timings) * 1000}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure SSE compression per level.")
+    parser.add_argument("--gzip-levels", type=int, nargs="+", default=[1, 3, 6, 9])
+    parser.add_argument("--brotli-qualities", type=int, nargs="+", default=[1, 4, 6, 9, 11])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per level")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)  # the app modules log every request at DEBUG/INFO
+    prepare()
+    configs: list[tuple[str | None, int]] = [(None, 0)]
+    configs += [("gzip", level) for level in args.gzip_levels]
+    if available_encodings(("br",)):
+        configs += [("br", quality) for quality in args.brotli_qualities]
+    else:
+        print("brotli is not installed: gzip only (pip install portfolio-backend[brotli])")
+
+    print(f"{'format':<10}{'encoding':<12}{'bytes':>12}{'ratio':>8}{'flush B/frame':>15}{'cpu ms':>10}")
+    for stream_format in tools.STREAM_FORMATS:
+        frames = request_frames(stream_format)
+        identity = sum(len(frame) for frame in frames)
+        for encoding, level in configs:
+            result = measure(frames, encoding, level, args.repeat)
+            name = f"{encoding}-{level}" if encoding else "identity"
+            print(
+                f"{stream_format:<10}{name:<12}{result['bytes']:>12}{result['bytes'] / identity:>8.3f}"
+                f"{result['bytes'] / len(frames):>15.1f}{result['cpu_ms']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
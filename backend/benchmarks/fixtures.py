@@ -0,0 +1,39 @@
+"""Synthetic inputs shared by the benchmarks."""
+
+from __future__ import annotations
+
+import copy
+from functools import cache
+from typing import Any
+
+from app.agent.tools import linkedin_fixture
+
+
+@cache
+def _scaled(scale: int) -> dict[str, Any]:
+    profile = copy.deepcopy(linkedin_fixture())
+    if scale == 1:
+        return profile
+    for key, value in list(profile.items()):
+        if isinstance(value, list) and value:
+            profile[key] = [copy.deepcopy(item) for _ in range(scale) for item in value]
+    profile["related_profiles"] = [
+        {
+            "profile_id": f"related-{i}",
+            "first_name": "Related",
+            "last_name": str(i),
+            "sub_title": "Software Engineer",
+            "profile_picture": "https://media.licdn.com/dms/image/" + "x" * 120,
+        }
+        for i in range(10 * scale)
+    ]
+    return profile
+
+
+def scaled_profile(scale: int = 1) -> dict[str, Any]:
+    """The bundled fixture profile with every list section repeated `scale`
+    times (plus ``10 * scale`` related profiles, which the fixture lacks).
+
+    ``scale=1`` is the fixture itself. Returns a fresh copy on every call.
+    """
+    return copy.deepcopy(_scaled(scale))
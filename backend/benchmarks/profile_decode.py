@@ -0,0 +1,78 @@
+"""Profile decoding benchmark: time and memory per profile.
+
+Compares the previous path (``json.loads`` + full ``PersonalProfileModel``
+validation, done twice by ``linkedin_node``) with :func:`decode_profile`,
+which parses with pydantic-core and validates only the fields the graph reads.
+
+Large profiles are synthesised from the bundled fixture (see
+:func:`.fixtures.scaled_profile`).
+
+Usage (from ``backend/``)::
+
+    python -m benchmarks.profile_decode [--scale 20] [--repeat 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from app.agent.tools import decode_profile
+from app.agent.schemas.linkedin_profile_models import PersonalProfileModel
+
+from .fixtures import scaled_profile
+
+
+def legacy_decode(body: bytes) -> PersonalProfileModel:
+    data = json.loads(body)
+    if isinstance(data, dict) and "data" in data and isinstance(data["data"], dict):
+        data = data["data"]
+    profile = PersonalProfileModel.model_validate(data)
+    # linkedin_node validated the already validated model a second time
+    return PersonalProfileModel.model_validate(profile)
+
+
+def measure(decode: Callable[[bytes], Any], body: bytes, repeat: int) -> dict[str, float]:
+    decode(body)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(body)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    tracemalloc.start()
+    result = decode(body)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "median_ms": 1000 * timings[len(timings) // 2],
+        "min_ms": 1000 * timings[0],
+        "retained_kib": retained / 1024,
+        "peak_kib": peak / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=20, help="times every list section is repeated")
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per decoder")
+    args = parser.parse_args()
+
+    body = json.dumps({"data": scaled_profile(args.scale)}).encode("utf-8")
+    print(f"profile: {len(body) / 1024:.0f} KiB of JSON (scale {args.scale})")
+    print(f"{'decoder':<28}{'median ms':>10}{'min ms':>10}{'retained KiB':>14}{'peak KiB':>10}")
+    for name, decode in (("json + full model x2", legacy_decode), ("decode_profile", decode_profile)):
+        stats = measure(decode, body, args.repeat)
+        print(
+            f"{name:<28}{stats['median_ms']:>10.2f}{stats['min_ms']:>10.2f}"
+            f"{stats['retained_kib']:>14.0f}{stats['peak_kib']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
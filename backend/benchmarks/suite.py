@@ -0,0 +1,373 @@
+"""Benchmarks of the streaming and transformation hot paths.
+
+Each benchmark is a (sync or async) function registered with
+:func:`benchmark`; the runner (``python -m benchmarks``) times its whole body
+and compares the counters it returns (frames / bytes emitted) and its CPU
+time against ``baselines.json``. Inputs are built by :func:`prepare`, before
+anything is timed, and cached.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import ExitStack
+from functools import cache
+from typing import Any, Awaitable, Callable
+from unittest import mock
+
+from app.agent import portfolio_graph, tools
+from app.agent.projection import compact_json, fit_to_budget, project_profile_for_projects, section_fingerprint
+from app.agent.schemas.linkedin_profile_models import PersonalProfileModel, PortfolioProfileModel
+from app.agent.serialization import sse_frame, to_jsonable
+from app.broadcast import BroadcastHub
+from app.compression import BROTLI_QUALITY, GZIP_LEVEL, available_encodings, frame_compressor
+
+from .fixtures import scaled_profile
+
+Counters = dict[str, int]
+BenchmarkFn = Callable[[], "Counters | Awaitable[Counters]"]
+
+BENCHMARKS: dict[str, BenchmarkFn] = {}
+
+
+def benchmark(name: str) -> Callable[[BenchmarkFn], BenchmarkFn]:
+    def register(fn: BenchmarkFn) -> BenchmarkFn:
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------------
+
+
+async def _no_sleep(_delay: float = 0, result: Any = None) -> Any:
+    return result
+
+
+def _offline(writer: Callable[[Any], None] = lambda chunk: None) -> ExitStack:
+    """Patch out the stream writer and pacing sleeps of the nodes."""
+    stack = ExitStack()
+    stack.enter_context(mock.patch.object(tools, "get_stream_writer", lambda: writer))
+    stack.enter_context(mock.patch.object(portfolio_graph, "get_stream_writer", lambda: writer))
+    stack.enter_context(mock.patch.object(tools.asyncio, "sleep", _no_sleep))
+    return stack
+
+
+raw_profile = cache(scaled_profile)
+
+
+@cache
+def profile(scale: int) -> PortfolioProfileModel:
+    return tools.decode_profile(raw_profile(scale))
+
+
+@cache
+def section(node: str, scale: int) -> dict[str, Any]:
+    """Output of `about_node` / `experience_node` for a scaled profile."""
+
+    async def no_stream(*args: Any, **kwargs: Any) -> None:
+        return None
+
+    state = {"linkedin_id": "bench", "linkedin_data": profile(scale)}
+    with _offline(), mock.patch.object(portfolio_graph, "stream_state", no_stream):
+        output = asyncio.run(getattr(portfolio_graph, node)(state))
+    return next(iter(output.values()))
+
+
+@cache
+def recorded_messages(stream_format: str) -> list[dict[str, Any]]:
+    """SSE messages of streaming the about section in `stream_format`."""
+    chunks: list[Any] = []
+    with _offline(chunks.append):
+        asyncio.run(tools.stream_state("about_node", section("about_node", 1), delay=0, stream_format=stream_format))
+    return [{"event": "custom", "data": chunk} for chunk in chunks]
+
+
+@cache
+def projects_partials() -> list[dict[str, Any]]:
+    """Partial answers of a structured-output LLM call, one per ~4-character token.
+
+    The final answer lists the fixture's projects; every partial extends the
+    last string of the previous one, as a streaming JSON parser yields them.
+    """
+    final = [
+        {"title": project.get("title") or "", "description": project.get("description") or "", "technologies": ["python"]}
+        for project in raw_profile(1).get("projects") or []
+    ]
+    partials: list[dict[str, Any]] = []
+    for index, project in enumerate(final):
+        done = final[:index]
+        for key in ("title", "description"):
+            text = project[key]
+            for cut in range(0, len(text) + 4, 4):
+                current = {"title": project["title"]} if key == "description" else {}
+                current[key] = text[:cut]
+                partials.append({"projects": [*done, current]})
+    partials.append({"projects": final})
+    return partials
+
+
+@cache
+def request_frames(stream_format: str) -> list[bytes]:
+    """SSE frames (with event ids) of a whole uncoalesced stream request:
+    the about and experience sections and the projects answer."""
+    chunks: list[Any] = []
+    with _offline(chunks.append):
+        for node in ("about_node", "experience_node"):
+            asyncio.run(tools.stream_state(node, section(node, 1), delay=0, stream_format=stream_format))
+        streamer = tools.PartialStreamer("projects_node", stream_format=stream_format, frame_interval=0)
+        for partial in projects_partials():
+            streamer.emit(partial)
+        streamer.close()
+    return [sse_frame({"event": "custom", "data": chunk}, f"0123456789abcdef:{seq}") for seq, chunk in enumerate(chunks, 1)]
+
+
+def prepare() -> None:
+    """Build every cached input (outside of any running event loop)."""
+    for scale in (1, 10, 100):
+        raw_profile(scale)
+        profile(scale)
+    for scale in (1, 10):
+        section("about_node", scale)
+        section("experience_node", scale)
+    for stream_format in tools.STREAM_FORMATS:
+        recorded_messages(stream_format)
+    projects_partials()
+    for stream_format in tools.STREAM_FORMATS:
+        request_frames(stream_format)
+
+
+async def _stream(node: str, data: Any, stream_format: str, *, delay: float = 0, frame_interval: float = 0) -> Counters:
+    counters = {"frames": 0, "bytes": 0}
+
+    def writer(chunk: Any) -> None:
+        counters["frames"] += 1
+        counters["bytes"] += len(sse_frame({"event": "custom", "data": chunk}))
+
+    with _offline(writer):
+        await tools.stream_state(
+            node,
+            data,
+            delay=delay,
+            stream_format=stream_format,
+            frame_interval=frame_interval,
+            frame_boundary="word",
+        )
+    return counters
+
+
+# ---------------------------------------------------------------------------
+# stream_state (incl. SSE encoding of every frame)
+# ---------------------------------------------------------------------------
+
+
+@benchmark("stream_state/about/snapshot")
+async def stream_about_snapshot() -> Counters:
+    return await _stream("about_node", section("about_node", 1), "snapshot")
+
+
+@benchmark("stream_state/about/delta")
+async def stream_about_delta() -> Counters:
+    return await _stream("about_node", section("about_node", 1), "delta")
+
+
+@benchmark("stream_state/about/snapshot-coalesced")
+async def stream_about_snapshot_coalesced() -> Counters:
+    return await _stream("about_node", section("about_node", 1), "snapshot", delay=0.003, frame_interval=0.033)
+
+
+@benchmark("stream_state/experience-x10/delta")
+async def stream_experience_x10_delta() -> Counters:
+    return await _stream("experience_node", section("experience_node", 10), "delta")
+
+
+@benchmark("stream_state/experience-x10/snapshot-coalesced")
+async def stream_experience_x10_snapshot_coalesced() -> Counters:
+    return await _stream(
+        "experience_node", section("experience_node", 10), "snapshot", delay=0.001, frame_interval=0.033
+    )
+
+
+async def _partials(stream_format: str) -> Counters:
+    counters = {"frames": 0, "bytes": 0}
+
+    def writer(chunk: Any) -> None:
+        counters["frames"] += 1
+        counters["bytes"] += len(sse_frame({"event": "custom", "data": chunk}))
+
+    with _offline(writer):
+        streamer = tools.PartialStreamer("projects_node", stream_format=stream_format, frame_interval=0)
+        for partial in projects_partials():
+            streamer.emit(partial)
+        streamer.close()
+    return counters
+
+
+@benchmark("partial/projects/snapshot")
+async def partial_projects_snapshot() -> Counters:
+    return await _partials("snapshot")
+
+
+@benchmark("partial/projects/delta")
+async def partial_projects_delta() -> Counters:
+    return await _partials("delta")
+
+
+# ---------------------------------------------------------------------------
+# Serialisation / SSE framing
+# ---------------------------------------------------------------------------
+
+
+def _values_state(scale: int) -> dict[str, Any]:
+    return {
+        "linkedin_id": "bench",
+        "linkedin_status": "found",
+        "linkedin_data": profile(scale),
+        "about_data": section("about_node", scale),
+        "experience_data": section("experience_node", scale),
+    }
+
+
+@benchmark("to_jsonable/values-x1")
+def to_jsonable_values_x1() -> Counters:
+    to_jsonable(_values_state(1))
+    return {}
+
+
+@benchmark("to_jsonable/values-x10")
+def to_jsonable_values_x10() -> Counters:
+    to_jsonable(_values_state(10))
+    return {}
+
+
+def _frame_all(messages: list[dict[str, Any]]) -> Counters:
+    frames = [sse_frame(message) for message in messages]
+    return {"frames": len(frames), "bytes": sum(map(len, frames))}
+
+
+@benchmark("sse/frame-about-snapshot")
+def sse_frame_about_snapshot() -> Counters:
+    return _frame_all(recorded_messages("snapshot"))
+
+
+@benchmark("sse/frame-about-delta")
+def sse_frame_about_delta() -> Counters:
+    return _frame_all(recorded_messages("delta"))
+
+
+@benchmark("sse/frame-values-x1")
+def sse_frame_values_x1() -> Counters:
+    return _frame_all([{"event": "values", "data": _values_state(1)}])
+
+
+@benchmark("sse/hub-fanout-delta-10-clients")
+async def sse_hub_fanout() -> Counters:
+    """Broadcast a recorded delta stream to 10 subscribers through the hub."""
+    messages = recorded_messages("delta")
+
+    async def source():
+        for message in messages:
+            yield message
+
+    hub = BroadcastHub(encode=sse_frame, buffer_size=len(messages) + 8)
+
+    async def client() -> tuple[int, int]:
+        frames = nbytes = 0
+        async for frame in hub.subscribe("bench", source):
+            frames += 1
+            nbytes += len(frame)
+        return frames, nbytes
+
+    results = await asyncio.gather(*(client() for _ in range(10)))
+    return {"frames": sum(r[0] for r in results), "bytes": sum(r[1] for r in results)}
+
+
+def _compress(frames: list[bytes], encoding: str, level: int) -> Counters:
+    compressor = frame_compressor(encoding, level)
+    nbytes = sum(len(compressor.compress(frame)) for frame in frames) + len(compressor.finish())
+    return {"frames": len(frames), "bytes": nbytes}
+
+
+def _compression_benchmarks(encoding: str, level: int) -> None:
+    for stream_format in tools.STREAM_FORMATS:
+
+        @benchmark(f"sse/compress-{encoding}-{level}/{stream_format}")
+        def compress(stream_format: str = stream_format) -> Counters:
+            return _compress(request_frames(stream_format), encoding, level)
+
+
+_compression_benchmarks("gzip", GZIP_LEVEL)
+if "br" in available_encodings(("br",)):
+    _compression_benchmarks("br", BROTLI_QUALITY)
+
+
+# ---------------------------------------------------------------------------
+# Profile validation
+# ---------------------------------------------------------------------------
+
+
+def _validation_benchmarks(scale: int) -> None:
+    @benchmark(f"profile/full-model-x{scale}")
+    def full_model() -> Counters:
+        PersonalProfileModel.model_validate(raw_profile(scale))
+        return {}
+
+    @benchmark(f"profile/decode-x{scale}")
+    def decode() -> Counters:
+        tools.decode_profile(raw_profile(scale))
+        return {}
+
+
+for _scale in (1, 10, 100):
+    _validation_benchmarks(_scale)
+
+
+# ---------------------------------------------------------------------------
+# Section transforms
+# ---------------------------------------------------------------------------
+
+
+@benchmark("transform/format-date-range-x100")
+def format_date_range_x100() -> Counters:
+    for group in profile(100).position_groups or []:
+        portfolio_graph._format_date_range(group.date)
+        for position in group.profile_positions or []:
+            portfolio_graph._format_date_range(position.date)
+    return {}
+
+
+@benchmark("transform/experience-node-x10")
+async def experience_node_x10() -> Counters:
+    async def no_stream(*args: Any, **kwargs: Any) -> None:
+        return None
+
+    state = {"linkedin_id": "bench", "linkedin_data": profile(10)}
+    # Build the section every time instead of reusing it from SECTION_CACHE.
+    with _offline(), mock.patch.object(portfolio_graph, "stream_state", no_stream), mock.patch.object(
+        portfolio_graph, "reuses_sections", lambda: False
+    ):
+        await portfolio_graph.experience_node(state)
+    return {}
+
+
+@benchmark("transform/section-fingerprints-x10")
+def section_fingerprints_x10() -> Counters:
+    linkedin = profile(10)
+    for node in ("about_node", "experience_node"):
+        section_fingerprint(node, linkedin)
+    portfolio_graph.projects_fingerprint(linkedin)
+    return {}
+
+
+@benchmark("transform/projects-prompt-budget-x50")
+def projects_prompt_budget_x50() -> Counters:
+    """Trim the projects excerpt of a ~40k token profile to the default budget."""
+    excerpt = project_profile_for_projects(profile(50))
+    budgeted, _ = fit_to_budget(excerpt, portfolio_graph.PROJECTS_PROMPT_TOKENS)
+    return {"bytes": len(compact_json(budgeted))}
+
+
+__all__ = ["BENCHMARKS", "benchmark", "prepare"]
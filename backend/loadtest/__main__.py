@@ -0,0 +1,180 @@
+"""Load generator for ``/api/portfolio/stream``.
+
+Drives the streaming endpoint at a fixed concurrency and reports
+time-to-first-byte, time to each section (first frame and ``completed``
+status), total stream time, frames/sec and p50/p95/p99 latencies.
+
+Run the app against the stand-ins of :mod:`loadtest.fakes` for an offline
+test. Usage (from ``backend/``)::
+
+    python -m loadtest --url http://127.0.0.1:8000 -c 20 -n 200 [--format delta] [--profiles 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import aiohttp
+
+from .sse import frame_message
+
+SECTIONS = ("about_node", "projects_node", "experience_node")
+
+
+@dataclass
+class StreamResult:
+    """Timings (seconds since the request was sent) of one stream."""
+
+    status: int = 0
+    ttfb: float | None = None
+    total: float | None = None
+    frames: int = 0
+    bytes: int = 0
+    error: str | None = None
+    section_first: dict[str, float] = field(default_factory=dict)
+    section_done: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and self.error is None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (NaN when empty)."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def stream_once(session: aiohttp.ClientSession, url: str, linkedin_id: str, headers: dict[str, str]) -> StreamResult:
+    result = StreamResult()
+    start = time.perf_counter()
+    try:
+        async with session.post(url, json={"linkedin_id": linkedin_id}, headers=headers) as resp:
+            result.status = resp.status
+            buffer = b""
+            async for chunk in resp.content.iter_any():
+                now = time.perf_counter() - start
+                if result.ttfb is None:
+                    result.ttfb = now
+                result.bytes += len(chunk)
+                buffer += chunk
+                *frames, buffer = buffer.split(b"\n\n")
+                for frame in frames:
+                    message = frame_message(frame)
+                    if message is None:
+                        continue
+                    result.frames += 1
+                    if message.get("event") == "error":
+                        result.error = str(message.get("data"))
+                    data = message.get("data")
+                    if message.get("event") != "custom" or not isinstance(data, dict):
+                        continue
+                    node = data.get("current_node")
+                    result.section_first.setdefault(node, now)
+                    if data.get("chunk_type") == "node_update" and (data.get("data") or {}).get("status") == "completed":
+                        result.section_done[node] = now
+    except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+        result.error = f"{type(exc).__name__}: {exc}"
+    result.total = time.perf_counter() - start
+    return result
+
+
+async def run(args: argparse.Namespace) -> tuple[list[StreamResult], float]:
+    url = args.url.rstrip("/") + "/api/portfolio/stream"
+    headers = {"X-Stream-Format": args.format}
+    if args.no_cache:
+        headers["Cache-Control"] = "no-cache"
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(args.requests):
+        queue.put_nowait(i)
+    results: list[StreamResult] = []
+
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+
+        async def worker() -> None:
+            while not queue.empty():
+                i = queue.get_nowait()
+                linkedin_id = f"{args.id_prefix}-{i % args.profiles}"
+                results.append(await stream_once(session, url, linkedin_id, headers))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - start
+    return results, wall
+
+
+def report(results: list[StreamResult], wall: float) -> dict[str, Any]:
+    ok = [r for r in results if r.ok]
+    total_frames = sum(r.frames for r in ok)
+
+    def stats(values: list[float]) -> dict[str, float]:
+        return {f"p{p}": percentile(values, p) for p in (50, 95, 99)}
+
+    summary: dict[str, Any] = {
+        "requests": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "wall_s": wall,
+        "requests_per_s": len(results) / wall if wall else 0.0,
+        "frames_per_s": total_frames / wall if wall else 0.0,
+        "mb_per_s": sum(r.bytes for r in ok) / wall / 1e6 if wall else 0.0,
+        "latency_s": {
+            "ttfb": stats([r.ttfb for r in ok if r.ttfb is not None]),
+            "total": stats([r.total for r in ok if r.total is not None]),
+            **{f"{node}.first": stats([r.section_first[node] for r in ok if node in r.section_first]) for node in SECTIONS},
+            **{f"{node}.completed": stats([r.section_done[node] for r in ok if node in r.section_done]) for node in SECTIONS},
+        },
+        "stream_frames_per_s": stats([r.frames / r.total for r in ok if r.total]),
+        "errors": sorted({r.error or f"HTTP {r.status}" for r in results if not r.ok}),
+    }
+    return summary
+
+
+def print_report(summary: dict[str, Any]) -> None:
+    print(
+        f"{summary['requests']} requests, {summary['ok']} ok, {summary['failed']} failed "
+        f"in {summary['wall_s']:.2f}s – {summary['requests_per_s']:.1f} req/s, "
+        f"{summary['frames_per_s']:.0f} frames/s, {summary['mb_per_s']:.2f} MB/s"
+    )
+    print(f"{'latency (s)':<28}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, values in summary["latency_s"].items():
+        print(f"{name:<28}{values['p50']:>9.3f}{values['p95']:>9.3f}{values['p99']:>9.3f}")
+    values = summary["stream_frames_per_s"]
+    print(f"{'frames/s per stream':<28}{values['p50']:>9.0f}{values['p95']:>9.0f}{values['p99']:>9.0f}")
+    for error in summary["errors"]:
+        print(f"error: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test /api/portfolio/stream.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="base URL of the app")
+    parser.add_argument("-c", "--concurrency", type=int, default=10, help="concurrent streams")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="total streams")
+    parser.add_argument("--format", choices=("snapshot", "delta"), default="delta", help="X-Stream-Format")
+    parser.add_argument("--profiles", type=int, default=1_000_000, help="distinct linkedin ids to cycle through")
+    parser.add_argument("--id-prefix", default="loadtest", help="linkedin id prefix")
+    parser.add_argument("--no-cache", action="store_true", help="send Cache-Control: no-cache (skip the result store)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per stream")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    results, wall = asyncio.run(run(args))
+    summary = report(results, wall)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""Local stand-ins for the ProAPIS and OpenAI APIs, for offline load tests.
+
+- ProAPIS: ``POST /iscraper/v4/profile-details`` returns the bundled fixture
+  profile (optionally scaled up) under the requested ``profile_id``; ids
+  starting with ``missing`` get a 404.
+- OpenAI: ``POST /v1/chat/completions`` streams (or returns) a JSON
+  ``{"projects": [...]}`` answer (source ids, titles and descriptions)
+  built from the projects excerpt in the prompt, as message content
+  (``response_format``) or as tool-call arguments (``tools``), at a
+  configurable token rate.
+
+Both add a configurable latency and fail a configurable share of requests
+(429 for ProAPIS and OpenAI alike). Point the app at them with::
+
+    PROAPIS_KEY=fake PROAPIS_BASE_URL=http://127.0.0.1:9001 \\
+    OPENAI_API_KEY=fake OPENAI_BASE_URL=http://127.0.0.1:9002/v1 \\
+    uvicorn app.main:app
+
+Usage (from ``backend/``)::
+
+    python -m loadtest.fakes [--proapis-latency 0.5] [--llm-ttft 0.4] [--token-rate 80]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from aiohttp import web
+
+from app.agent.tools import linkedin_fixture
+
+
+@dataclass
+class FakeConfig:
+    """Behaviour of the stand-in servers."""
+
+    proapis_latency: float = 0.5
+    proapis_error_rate: float = 0.0
+    # Repeat every list section of the fixture this many times.
+    profile_scale: int = 1
+    # Put the profile id into the first project title so every id gets a
+    # distinct prompt (and misses the LLM result cache).
+    unique_profiles: bool = True
+    llm_ttft: float = 0.4
+    llm_token_rate: float = 80.0
+    llm_error_rate: float = 0.0
+
+
+# ---------------------------------------------------------------------------
+# ProAPIS
+# ---------------------------------------------------------------------------
+
+
+def _profile(profile_id: str, config: FakeConfig) -> dict[str, Any]:
+    profile = copy.deepcopy(linkedin_fixture())
+    profile["profile_id"] = profile_id
+    if config.profile_scale > 1:
+        for key, value in list(profile.items()):
+            if isinstance(value, list) and value:
+                profile[key] = [copy.deepcopy(v) for _ in range(config.profile_scale) for v in value]
+    if config.unique_profiles and profile.get("projects"):
+        profile["projects"][0]["title"] = f"{profile['projects'][0]['title']} ({profile_id})"
+    return profile
+
+
+def proapis_app(config: FakeConfig) -> web.Application:
+    async def profile_details(request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(config.proapis_latency)
+        if random.random() < config.proapis_error_rate:
+            return web.json_response({"message": "Too Many Requests"}, status=429, headers={"Retry-After": "1"})
+        profile_id = str(body.get("profile_id", ""))
+        if not profile_id or profile_id.startswith("missing"):
+            return web.json_response({"message": "Profile not found"}, status=404)
+        return web.json_response({"data": _profile(profile_id, config)})
+
+    app = web.Application()
+    app.router.add_post("/iscraper/v4/profile-details", profile_details)
+    return app
+
+
+# ---------------------------------------------------------------------------
+# OpenAI chat completions
+# ---------------------------------------------------------------------------
+
+
+def _answer(messages: list[dict[str, Any]]) -> str:
+    """A plausible projects answer for the excerpt in the last user message."""
+    prompt = next((m.get("content") for m in reversed(messages) if m.get("role") == "user"), "") or ""
+    excerpt: dict[str, Any] = {}
+    match = re.search(r"\{.*\}", prompt, re.S)
+    if match:
+        try:
+            excerpt = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            pass
+    projects = [
+        {"source": p.get("id", ""), "title": p.get("title", "Project"), "description": (p.get("description") or "")[:300]}
+        for p in excerpt.get("projects", [])
+    ]
+    projects += [
+        {
+            "source": p.get("id", ""),
+            "title": f"{p.get('company', 'Company')} platform",
+            "description": (p.get("description") or "")[:300],
+        }
+        for p in excerpt.get("positions", [])[:3]
+    ]
+    return json.dumps({"projects": projects[:8]}, ensure_ascii=False)
+
+
+def _tokens(text: str) -> list[str]:
+    """Split `text` into ~4-character pseudo tokens."""
+    return [text[i : i + 4] for i in range(0, len(text), 4)]
+
+
+def openai_app(config: FakeConfig) -> web.Application:
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        await asyncio.sleep(config.llm_ttft)
+        if random.random() < config.llm_error_rate:
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"Retry-After": "1"},
+            )
+
+        answer = _answer(body.get("messages", []))
+        tool = (body.get("tools") or [None])[0]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        model = body.get("model", "gpt-4o-mini")
+
+        def message_delta(text: str, first: bool) -> dict[str, Any]:
+            if tool is None:
+                return {"role": "assistant", "content": text} if first else {"content": text}
+            call: dict[str, Any] = {"index": 0, "function": {"arguments": text}}
+            if first:
+                call.update(id=f"call_{uuid.uuid4().hex[:24]}", type="function")
+                call["function"]["name"] = tool["function"]["name"]
+            return {"role": "assistant", "content": None, "tool_calls": [call]} if first else {"tool_calls": [call]}
+
+        finish_reason = "stop" if tool is None else "tool_calls"
+        if not body.get("stream"):
+            await asyncio.sleep(len(_tokens(answer)) / config.llm_token_rate)
+            message = message_delta(answer, first=True)
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(_tokens(answer)), "total_tokens": 0},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+
+        async def send(delta: dict[str, Any], finish: str | None = None) -> None:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        for i, token in enumerate(_tokens(answer)):
+            await send(message_delta(token, first=i == 0))
+            await asyncio.sleep(1 / config.llm_token_rate)
+        await send({}, finish_reason)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/chat/completions", chat_completions)
+    return app
+
+
+async def serve(config: FakeConfig, host: str, proapis_port: int, openai_port: int) -> list[web.AppRunner]:
+    """Start both stand-ins; returns their runners (``await runner.cleanup()`` to stop)."""
+    runners = []
+    for app, port in ((proapis_app(config), proapis_port), (openai_app(config), openai_port)):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        runners.append(runner)
+    return runners
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the ProAPIS and OpenAI stand-ins.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--proapis-port", type=int, default=9001)
+    parser.add_argument("--openai-port", type=int, default=9002)
+    parser.add_argument("--proapis-latency", type=float, default=0.5, help="seconds per profile request")
+    parser.add_argument("--proapis-error-rate", type=float, default=0.0, help="share of 429 answers (0-1)")
+    parser.add_argument("--profile-scale", type=int, default=1, help="repeat list sections N times")
+    parser.add_argument("--same-profiles", action="store_true", help="identical profiles for every id (LLM cache hits)")
+    parser.add_argument("--llm-ttft", type=float, default=0.4, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=80.0, help="streamed tokens per second")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of 429 answers (0-1)")
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        proapis_latency=args.proapis_latency,
+        proapis_error_rate=args.proapis_error_rate,
+        profile_scale=args.profile_scale,
+        unique_profiles=not args.same_profiles,
+        llm_ttft=args.llm_ttft,
+        llm_token_rate=args.token_rate,
+        llm_error_rate=args.llm_error_rate,
+    )
+
+    async def run() -> None:
+        runners = await serve(config, args.host, args.proapis_port, args.openai_port)
+        print(f"ProAPIS stand-in: http://{args.host}:{args.proapis_port}")
+        print(f"OpenAI stand-in:  http://{args.host}:{args.openai_port}/v1")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            for runner in runners:
+                await runner.cleanup()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
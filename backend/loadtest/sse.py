@@ -0,0 +1,29 @@
+"""Parsing of the ``text/event-stream`` frames sent by ``/api/portfolio/stream``."""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+
+def frame_data(frame: bytes) -> bytes | None:
+    """The ``data`` field of one SSE frame (``None`` when it has none).
+
+    Fields may come in any order (frames start with an ``id:`` line); several
+    ``data:`` lines are joined with newlines, as a browser does.
+    """
+    data = [
+        line[5:].removeprefix(b" ")
+        for line in frame.split(b"\n")
+        if line.startswith(b"data:")
+    ]
+    return b"\n".join(data) if data else None
+
+
+def frame_message(frame: bytes) -> dict[str, Any] | None:
+    """The JSON message of one SSE frame (``None`` for frames without data)."""
+    data = frame_data(frame)
+    return None if data is None else json.loads(data)
+
+
+__all__ = ["frame_data", "frame_message"]
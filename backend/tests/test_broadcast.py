@@ -0,0 +1,195 @@
+import asyncio
+
+from app.agent.patches import append_op, apply_ops
+from app.agent.serialization import sse_frame
+from app.broadcast import BroadcastHub, FrameBuffer
+
+from loadtest.sse import frame_message
+
+
+STARTED = {"event": "custom", "data": {"chunk_type": "node_update", "current_node": "about", "data": {"status": "started"}}}
+
+
+def snapshot(text: str) -> dict:
+    return {"event": "custom", "data": {"chunk_type": "structured", "current_node": "about", "data": {"text": text}}}
+
+
+def patch(suffix: str) -> dict:
+    return {"event": "custom", "data": {"chunk_type": "patch", "current_node": "about", "ops": [append_op("/text", suffix)]}}
+
+
+def event_id(frame: bytes) -> str | None:
+    first = frame.split(b"\n", 1)[0]
+    return first[4:].decode() if first.startswith(b"id: ") else None
+
+
+def section_state(frames: list[bytes]) -> dict | None:
+    """The ``about`` section as a client builds it from `frames`."""
+    state = None
+    for frame in frames:
+        chunk = frame_message(frame)["data"]
+        if chunk.get("chunk_type") == "structured":
+            state = chunk["data"]
+        elif chunk.get("chunk_type") == "patch":
+            state = apply_ops(state, chunk["ops"])
+    return state
+
+
+async def collect(frames) -> list[bytes]:
+    return [frame async for frame in frames]
+
+
+def queue_source(queue: asyncio.Queue):
+    async def source():
+        while (message := await queue.get()) is not None:
+            yield message
+
+    return source
+
+
+async def send(queue: asyncio.Queue, *messages) -> None:
+    """Feed `messages` to the run and let it fan them out."""
+    for message in messages:
+        queue.put_nowait(message)
+    await asyncio.sleep(0.01)
+
+
+def test_frame_buffer_collapses_section_frames_once_full():
+    buffer = FrameBuffer(2, resync=lambda node: f"resync {node}")
+    buffer.put("s1", "about", "snapshot")
+    buffer.put("p1", "about", "patch")
+    buffer.put("status")  # never dropped
+    buffer.put("p2", "about", "patch")  # replaces s1/p1 by a resync marker
+    buffer.put("p3", "about", "patch")  # covered by the pending resync
+    buffer.put("s2", "projects", "snapshot")
+    buffer.put("s3", "projects", "snapshot")  # replaces s2
+
+    async def drain():
+        return [await buffer.get() for _ in range(len(buffer))]
+
+    assert asyncio.run(drain()) == ["status", "resync about", "s3"]
+    assert buffer.collapsed == 5
+
+
+def test_only_the_subscriber_starting_a_run_is_admitted():
+    async def main():
+        hub = BroadcastHub(encode=sse_frame)
+        release = asyncio.Event()
+        calls = []
+
+        async def source():
+            await release.wait()
+            yield {"event": "values", "data": {}}
+
+        async def admit():
+            calls.append("admit")
+            # Another request starts the run while this one waits for a slot.
+            await asyncio.sleep(0.05)
+            return lambda: calls.append("done")
+
+        first = asyncio.create_task(collect(hub.subscribe("key", source, admit=admit)))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(
+            collect(hub.subscribe("key", source, admit=admit, on_join=lambda: calls.append("join")))
+        )
+        await asyncio.sleep(0.1)
+        release.set()
+        await asyncio.gather(first, second)
+        return calls
+
+    # Both ask for a slot (nothing ran yet); the second gives its slot back and joins.
+    assert asyncio.run(main()) == ["admit", "admit", "done", "join", "done"]
+
+
+def test_a_joining_subscriber_is_not_admitted():
+    async def main():
+        hub = BroadcastHub(encode=sse_frame)
+        release = asyncio.Event()
+        calls = []
+
+        async def source():
+            await release.wait()
+            yield {"event": "values", "data": {}}
+
+        async def admit():
+            calls.append("admit")
+            return lambda: calls.append("done")
+
+        first = asyncio.create_task(collect(hub.subscribe("key", source, admit=admit)))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(
+            collect(hub.subscribe("key", source, admit=admit, on_join=lambda: calls.append("join")))
+        )
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(first, second)
+        return calls
+
+    assert asyncio.run(main()) == ["admit", "join", "done"]
+
+
+def test_slow_consumer_gets_the_current_section_state():
+    messages = [snapshot("")] + [patch(str(i)) for i in range(50)] + [{"event": "values", "data": {}}]
+
+    async def main():
+        hub = BroadcastHub(encode=sse_frame, buffer_size=4)
+
+        async def source():
+            for message in messages:
+                yield message  # the run outpaces the client
+
+        return await collect(hub.subscribe("key", source))
+
+    frames = asyncio.run(main())
+    assert len(frames) < len(messages)
+    assert section_state(frames) == {"text": "".join(str(i) for i in range(50))}
+    assert frame_message(frames[-1])["event"] == "values"
+
+
+def test_late_joiner_catches_up_then_follows_the_run():
+    async def main():
+        hub = BroadcastHub(encode=sse_frame)
+        queue = asyncio.Queue()
+        first = asyncio.create_task(collect(hub.subscribe("key", queue_source(queue), run_id="run")))
+        await send(queue, STARTED, snapshot("a"), patch("b"), patch("c"))
+        late = asyncio.create_task(collect(hub.subscribe("key", queue_source(queue))))
+        await send(queue, patch("d"), None)
+        return await first, await late
+
+    first, late = asyncio.run(main())
+    assert section_state(first) == section_state(late) == {"text": "abcd"}
+    # the state so far, the last frame with the id of the last message it covers
+    assert [frame_message(frame) for frame in late] == [STARTED, snapshot("abc"), patch("d")]
+    assert [event_id(frame) for frame in late] == [None, "run:4", "run:5"]
+
+
+def test_resume_replays_missed_frames_unless_a_resync_covers_them():
+    async def main():
+        hub = BroadcastHub(encode=sse_frame, buffer_size=2, replay_size=100)
+        queue = asyncio.Queue()
+        slow = hub.subscribe("key", queue_source(queue), run_id="run")
+        reading = asyncio.create_task(anext(slow))
+        await send(queue, STARTED, snapshot(""))
+        assert [event_id(await reading), event_id(await anext(slow))] == ["run:1", "run:2"]
+        # The slow client isn't reading: 3-4 are queued, then 3-7 collapse into a resync.
+        await send(queue, patch("a"), patch("b"), patch("c"), snapshot("abcd"), patch("e"))
+        resync = await anext(slow)
+        assert (event_id(resync), frame_message(resync)) == (None, snapshot("abcde"))
+
+        async def resume(last_event_id):
+            frames = hub.subscribe("key", queue_source(queue), last_event_id=last_event_id)
+            received = [await anext(frames), await anext(frames)]
+            await frames.aclose()
+            return [(event_id(frame), frame_message(frame)) for frame in received]
+
+        # Replaying the patches after 2 would apply them twice on top of the resync.
+        caught_up = await resume("run:2")
+        # After 5, the snapshot at 6 replaces the client's section first.
+        replayed = await resume("run:5")
+        await send(queue, None)
+        await slow.aclose()
+        return caught_up, replayed
+
+    caught_up, replayed = asyncio.run(main())
+    assert caught_up == [(None, STARTED), ("run:7", snapshot("abcde"))]
+    assert replayed == [("run:6", snapshot("abcd")), ("run:7", patch("e"))]
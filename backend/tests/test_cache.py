@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+import time
+
+from app.agent.cache import MISSING, SharedSQLiteStore, TTLCache
+
+# Time a caller spends computing a value, and using one it was given.
+WORK = 0.2
+CALLERS = 5
+
+
+async def use_lease(cache: TTLCache, key: str) -> str:
+    async with cache.lease(key) as value:
+        await asyncio.sleep(WORK)
+        if value is MISSING:
+            await cache.set(key, "computed")
+            return "computed"
+        return value
+
+
+async def timed_gather(*calls) -> tuple[list, float]:
+    start = time.monotonic()
+    results = await asyncio.gather(*calls)
+    return results, time.monotonic() - start
+
+
+def test_lease_concurrent_hits_run_in_parallel():
+    async def main():
+        cache = TTLCache(maxsize=8)
+        await cache.set("key", "cached")
+        return await timed_gather(*(use_lease(cache, "key") for _ in range(CALLERS)))
+
+    results, elapsed = asyncio.run(main())
+    assert results == ["cached"] * CALLERS
+    assert elapsed < 2 * WORK
+
+
+def test_lease_waiters_replay_in_parallel_after_one_computation():
+    async def main():
+        cache = TTLCache(maxsize=8)
+        results, elapsed = await timed_gather(*(use_lease(cache, "key") for _ in range(CALLERS)))
+        return results, elapsed, cache.stats
+
+    results, elapsed, stats = asyncio.run(main())
+    assert results == ["computed"] * CALLERS
+    assert (stats.misses, stats.coalesced) == (1, CALLERS - 1)
+    # one computation, then every waiter uses the value at the same time
+    assert elapsed < 3 * WORK
+
+
+def test_shared_lease_waiters_replay_in_parallel(tmp_path):
+    async def main():
+        store = SharedSQLiteStore(str(tmp_path / "cache.db"))
+        cache = TTLCache(maxsize=8, store=store)
+        results, elapsed = await timed_gather(*(use_lease(cache, "key") for _ in range(CALLERS)))
+        return results, elapsed, store
+
+    results, elapsed, store = asyncio.run(main())
+    assert results == ["computed"] * CALLERS
+    assert elapsed < 3 * WORK
+    # the lease was given back
+    assert store.acquire("key") is not None
+
+
+def test_locked_database_does_not_block_the_event_loop(tmp_path):
+    path = str(tmp_path / "cache.db")
+
+    async def main():
+        cache = TTLCache(maxsize=8, store=SharedSQLiteStore(path))
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        asyncio.get_running_loop().call_later(WORK, other.rollback)
+        await cache.set("key", "value")
+        ticker.cancel()
+        other.close()
+        return ticks
+
+    assert asyncio.run(main()) >= 5
+    assert TTLCache(maxsize=8, store=SharedSQLiteStore(path)).store.load("key")[1] == "value"
@@ -0,0 +1,15 @@
+import logging
+
+from app.agent.portfolio_graph import checkpoint_serde
+from app.agent.schemas.linkedin_profile_models import PortfolioProfileModel
+from benchmarks.suite import profile
+
+
+def test_profiles_survive_a_checkpoint_without_warnings(caplog):
+    serde = checkpoint_serde()
+    linkedin = profile(1)
+    with caplog.at_level(logging.WARNING):
+        restored = serde.loads_typed(serde.dumps_typed({"linkedin_data": linkedin}))["linkedin_data"]
+    assert isinstance(restored, PortfolioProfileModel)
+    assert restored == linkedin
+    assert not [r for r in caplog.records if "checkpoint" in r.getMessage()]
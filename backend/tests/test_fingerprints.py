@@ -0,0 +1,15 @@
+from app.agent import portfolio_graph
+from benchmarks.suite import profile
+
+
+def test_projects_fingerprint_covers_the_prompt_settings(monkeypatch):
+    linkedin = profile(1)
+    fingerprint = portfolio_graph.projects_fingerprint(linkedin)
+    assert portfolio_graph.projects_fingerprint(linkedin) == fingerprint
+
+    monkeypatch.setattr(portfolio_graph, "PROJECTS_PROMPT_TOKENS", portfolio_graph.PROJECTS_PROMPT_TOKENS // 2)
+    assert portfolio_graph.projects_fingerprint(linkedin) != fingerprint
+
+    monkeypatch.undo()
+    monkeypatch.setattr(portfolio_graph, "PROJECTS_SYSTEM_PROMPT", portfolio_graph.PROJECTS_SYSTEM_PROMPT + "\n")
+    assert portfolio_graph.projects_fingerprint(linkedin) != fingerprint
@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from app.agent.limits import AdmissionRejected, Limiter
+
+
+def test_patient_callers_wait_past_max_wait():
+    async def main():
+        limiter = Limiter("test", 1, max_queue=1, max_wait=0.05)
+        ticket = await limiter.acquire()
+        with pytest.raises(AdmissionRejected):
+            await limiter.acquire()
+        asyncio.get_running_loop().call_later(0.2, ticket.release)
+        patient = await limiter.acquire(patient=True)
+        patient.release()
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert (limiter.in_use, limiter.waiting, limiter.rejected) == (0, 0, 1)
+
+
+def test_patient_callers_are_rejected_when_the_queue_is_full():
+    async def main():
+        limiter = Limiter("test", 1, max_queue=1, max_wait=0.05)
+        ticket = await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire(patient=True))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire(patient=True)
+        ticket.release()
+        (await waiter).release()
+        return rejected.value
+
+    assert asyncio.run(main()).retry_after == 0.05
@@ -0,0 +1,45 @@
+import copy
+
+import pytest
+
+from app.agent.patches import apply_ops, diff_ops
+
+CASES = {
+    "unchanged": ({"a": 1}, {"a": 1}),
+    "new key": ({"a": 1}, {"a": 1, "b": {"c": [1]}}),
+    "keys with / and ~": ({"a/b": "x", "~c": [], "d~1/": {}}, {"a/b": "xy", "~c": ["z"], "d~1/": {"~0": 1}}),
+    "string append": ({"summary": "Senior"}, {"summary": "Senior engineer"}),
+    "list append": ({"items": [{"name": "a"}]}, {"items": [{"name": "a"}, {"name": "b"}]}),
+    "append in list item": ({"items": ["ab", {"t": "c"}]}, {"items": ["abc", {"t": "cd"}, "e"]}),
+    "changed string": ({"a": "abc", "b": 1}, {"a": "xbc", "b": 1}),
+    "removed key": ({"a": {"b": 1, "c": 2}}, {"a": {"b": 1}}),
+    "shorter list": ({"a": [1, 2], "b": "x"}, {"a": [1], "b": "xy"}),
+    "changed list item": ({"a": [[1, 2], 3]}, {"a": [[1, 3], 3, 4]}),
+    "type replacement": ({"a": "1", "b": [1], "c": {}}, {"a": 1, "b": {"0": 1}, "c": None}),
+    "root string": ("ab", "abc"),
+    "root list": ([1, "a"], [1, "ab", {"c": "d"}]),
+    "root type": ({"a": 1}, [1]),
+    "from nothing": (None, {"a": "b"}),
+}
+
+
+@pytest.mark.parametrize(("prev", "new"), CASES.values(), ids=CASES.keys())
+def test_diff_ops_round_trip(prev, new):
+    ops = diff_ops(prev, new)
+    assert apply_ops(copy.deepcopy(prev), ops) == new
+
+
+def test_growing_documents_diff_to_the_new_parts_only():
+    prev = {"a/b": "Sen", "items": [{"name": "a"}]}
+    new = {"a/b": "Senior", "items": [{"name": "a"}, {"name": "b"}], "~": 1}
+    assert diff_ops(prev, new) == [
+        {"op": "append", "path": "/a~1b", "value": "ior"},
+        {"op": "add", "path": "/items/-", "value": {"name": "b"}},
+        {"op": "add", "path": "/~0", "value": 1},
+    ]
+
+
+def test_changes_re_add_the_closest_object_member():
+    prev = {"a": {"list": [1, 2], "keep": "x"}}
+    new = {"a": {"list": [2, 2, 3], "keep": "x"}}
+    assert diff_ops(prev, new) == [{"op": "add", "path": "/a/list", "value": [2, 2, 3]}]
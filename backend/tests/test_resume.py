@@ -0,0 +1,40 @@
+import asyncio
+
+from app.resume import ResumableRuns
+
+
+class Checkpointer:
+    def __init__(self) -> None:
+        self.threads = {"t1", "t2"}
+
+    def get_tuple(self, config):
+        return object() if config["configurable"]["thread_id"] in self.threads else None
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.threads.discard(thread_id)
+
+
+def test_interrupted_threads_are_deleted_after_the_ttl_without_new_traffic():
+    checkpointer = Checkpointer()
+
+    async def main():
+        runs = ResumableRuns(checkpointer, ttl=0.2, maxsize=8)
+        runs.register("r1", "t1", "key")
+        assert runs.thread_for("r1", "key") == "t1"
+        await asyncio.sleep(0.5)
+        return runs
+
+    runs = asyncio.run(main())
+    assert len(runs) == 0
+    assert checkpointer.threads == {"t2"}
+
+
+def test_finish_forgets_the_runs_of_the_thread():
+    checkpointer = Checkpointer()
+    runs = ResumableRuns(checkpointer, ttl=60, maxsize=8)
+    runs.register("r1", "t1", "key")
+    runs.register("r2", "t1", "key")
+    runs.finish("t1")
+    assert len(runs) == 0
+    assert runs.thread_for("r1", "key") is None
+    assert checkpointer.threads == {"t2"}
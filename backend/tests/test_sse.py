@@ -0,0 +1,13 @@
+from app.agent.serialization import sse_frame
+from loadtest.sse import frame_data, frame_message
+
+
+def test_frame_message_reads_data_after_the_id_field():
+    message = {"event": "custom", "data": {"chunk_type": "patch"}}
+    assert frame_message(sse_frame(message).rstrip(b"\n")) == message
+    assert frame_message(sse_frame(message, "run:7").rstrip(b"\n")) == message
+
+
+def test_frame_data_joins_data_lines_and_skips_frames_without_data():
+    assert frame_data(b"id: run:1\ndata: a\ndata:b") == b"a\nb"
+    assert frame_data(b": keep-alive") is None
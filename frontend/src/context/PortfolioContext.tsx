@@ -4,6 +4,7 @@ import { usePortfolioStream, SectionKey, PortfolioState } from '@/hooks/usePortf
 interface PortfolioContextValue {
   state: PortfolioState;
   loadingSection?: SectionKey;
+  activeSections: SectionKey[];
   streaming: boolean;
   finished: boolean;
   error?: string | null;
@@ -1,4 +1,5 @@
 import { useCallback, useRef, useState, useEffect } from 'react';
+import { applyPatch, PatchOp } from '@/lib/patch';
 
 /**
  * Shape of the final payload returned by the backend (values event).
@@ -16,8 +17,10 @@ export type SectionKey = 'about' | 'projects' | 'experience';
 interface UsePortfolioStreamReturn {
   /* Live partial / final data */
   state: PortfolioState;
-  /* Currently processing section, undefined when idle or finished */
+  /* Most recently started section still processing, undefined when idle or finished */
   loadingSection?: SectionKey;
+  /* All sections currently processing (the backend runs them concurrently) */
+  activeSections: SectionKey[];
   /* True while streaming in progress */
   streaming: boolean;
   /* True after `values` event arrived */
@@ -30,10 +33,14 @@ interface UsePortfolioStreamReturn {
   abort: () => void;
 }
 
+/* Reconnects (with Last-Event-ID) after the connection drops mid-stream */
+const MAX_RECONNECTS = 3;
+const RECONNECT_DELAY_MS = 1000;
+
 /**
- * Lightweight SSE line parser (supports default event name & custom events).
+ * Lightweight SSE line parser (supports default event name, custom events & ids).
  */
-function createSSEParser(onEvent: (ev: { event?: string; data: string }) => void) {
+function createSSEParser(onEvent: (ev: { event?: string; data: string; id?: string }) => void) {
   let buffer = '';
   return (chunk: string) => {
     buffer += chunk;
@@ -43,15 +50,18 @@ function createSSEParser(onEvent: (ev: { event?: string; data: string }) => void
     for (const part of parts) {
       const lines = part.split(/\n/);
       let event: string | undefined;
+      let id: string | undefined;
       let data = '';
       for (const line of lines) {
-        if (line.startsWith('event:')) {
+        if (line.startsWith('id:')) {
+          id = line.replace(/^id:\s*/, '').trim();
+        } else if (line.startsWith('event:')) {
           event = line.replace(/^event:\s*/, '').trim();
         } else if (line.startsWith('data:')) {
           data += line.replace(/^data:\s*/, '').trim();
         }
       }
-      if (data) onEvent({ event, data });
+      if (data) onEvent({ event, data, id });
     }
   };
 }
@@ -66,7 +76,12 @@ export function usePortfolioStream(): UsePortfolioStreamReturn {
       return {};
     }
   });
-  const [loadingSection, setLoadingSection] = useState<SectionKey | undefined>();
+  const [activeSections, setActiveSections] = useState<SectionKey[]>([]);
+  const loadingSection = activeSections[activeSections.length - 1];
+  const sectionStarted = (section: SectionKey) =>
+    setActiveSections((prev) => [...prev.filter((s) => s !== section), section]);
+  const sectionCompleted = (section: SectionKey) =>
+    setActiveSections((prev) => prev.filter((s) => s !== section));
   const [streaming, setStreaming] = useState(false);
   const [finished, setFinished] = useState(() => !!localStorage.getItem(STORAGE_KEY));
   const [error, setError] = useState<string | null>(null);
@@ -76,7 +91,7 @@ export function usePortfolioStream(): UsePortfolioStreamReturn {
     abortRef.current?.abort();
     abortRef.current = null;
     setStreaming(false);
-    setLoadingSection(undefined);
+    setActiveSections([]);
     setError(null);
   }, []);
 
@@ -94,25 +109,11 @@ export function usePortfolioStream(): UsePortfolioStreamReturn {
     setError(null);
     setState({ linkedin_id: linkedinId });
 
-    const resp = await fetch('/api/portfolio/stream', {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-        Accept: 'text/event-stream',
-      },
-      body: JSON.stringify({ linkedin_id: linkedinId }),
-      signal: controller.signal,
-    });
-
-    if (!resp.ok || !resp.body) {
-      console.error('Streaming API error', resp.statusText);
-      setStreaming(false);
-      return;
-    }
-
-    const reader = resp.body.getReader();
-    const utf8Decoder = new TextDecoder('utf-8');
-    const parse = createSSEParser(({ event, data }) => { /* handle one SSE message */
+    // Id of the last event received; a reconnect sends it as Last-Event-ID
+    // so the backend continues the run instead of starting it over.
+    let lastEventId: string | undefined;
+    const handleEvent = ({ event, data, id }: { event?: string; data: string; id?: string }) => { /* handle one SSE message */
+      if (id) lastEventId = id;
       try {
         const parsed = JSON.parse(data);
         // If backend embeds its own "event" field inside the JSON (as per examples)
@@ -120,13 +121,13 @@ export function usePortfolioStream(): UsePortfolioStreamReturn {
         switch (evtType) {
           case 'node_update': {
             const { current_node, data: nodeData } = parsed;
+            // current_node like "about_node" → strip suffix
+            const section = current_node.replace(/_node$/, '') as SectionKey;
             if (nodeData?.status === 'started') {
-              // current_node like "about_node" → strip suffix
-              const section = current_node.replace(/_node$/, '') as SectionKey;
-              setLoadingSection(section);
+              sectionStarted(section);
             }
             if (nodeData?.status === 'completed') {
-              setLoadingSection(undefined);
+              sectionCompleted(section);
             }
             break;
           }
@@ -134,16 +135,22 @@ export function usePortfolioStream(): UsePortfolioStreamReturn {
             const inner = parsed.data ?? parsed;
             if (inner.chunk_type === 'node_update') {
               const { current_node, data: nodeData } = inner;
+              const section = current_node.replace(/_node$/, '') as SectionKey;
               if (nodeData?.status === 'started') {
-                const section = current_node.replace(/_node$/, '') as SectionKey;
-                setLoadingSection(section);
+                sectionStarted(section);
               }
               if (nodeData?.status === 'completed') {
-                setLoadingSection(undefined);
+                sectionCompleted(section);
               }
               break;
             }
-            // structured chunk
+            if (inner.chunk_type === 'patch') {
+              const { current_node, ops } = inner as { current_node: string; ops: PatchOp[] };
+              const key = `${current_node.replace(/_node$/, '')}_data` as keyof PortfolioState;
+              setState((prev) => ({ ...prev, [key]: applyPatch(prev[key], ops) } as PortfolioState));
+              break;
+            }
+            // structured chunk (full snapshot / keyframe)
             const { current_node } = inner;
             const sectionData = inner.data ?? inner;
             if (current_node && sectionData) {
@@ -157,7 +164,7 @@ export function usePortfolioStream(): UsePortfolioStreamReturn {
             console.error('Backend error', message);
             setError(message);
             setStreaming(false);
-            setLoadingSection(undefined);
+            setActiveSections([]);
             setFinished(true);
             break;
           }
@@ -177,17 +184,55 @@ export function usePortfolioStream(): UsePortfolioStreamReturn {
       } catch (err) {
         console.error('SSE parse error', err);
       }
-    });
+    };
+
+    for (let attempt = 0; ; attempt++) {
+      try {
+        const resp = await fetch('/api/portfolio/stream', {
+          method: 'POST',
+          headers: {
+            'Content-Type': 'application/json',
+            Accept: 'text/event-stream',
+            // Ask for patch chunks instead of full snapshots on every step
+            'X-Stream-Format': 'delta',
+            ...(lastEventId ? { 'Last-Event-ID': lastEventId } : {}),
+          },
+          body: JSON.stringify({ linkedin_id: linkedinId }),
+          signal: controller.signal,
+        });
+
+        if (!resp.ok || !resp.body) {
+          console.error('Streaming API error', resp.statusText);
+          setStreaming(false);
+          return;
+        }
 
-    
-    while (true) {
-      const { done, value } = await reader.read();
-      if (done) break;
-      parse(utf8Decoder.decode(value, { stream: true }));
+        const reader = resp.body.getReader();
+        const utf8Decoder = new TextDecoder('utf-8');
+        const parse = createSSEParser(handleEvent);
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          parse(utf8Decoder.decode(value, { stream: true }));
+        }
+        break;
+      } catch (err) {
+        // Aborted by the user, or still failing after a few reconnects
+        if (controller.signal.aborted || attempt >= MAX_RECONNECTS) {
+          if (!controller.signal.aborted) {
+            console.error('Streaming connection lost', err);
+            setError('Connection lost');
+          }
+          setStreaming(false);
+          setActiveSections([]);
+          return;
+        }
+        await new Promise((resolve) => setTimeout(resolve, RECONNECT_DELAY_MS));
+      }
     }
     setStreaming(false);
     setFinished(true);
-    setLoadingSection(undefined);
+    setActiveSections([]);
   }, [abort]);
 
   // Persist final state to localStorage when streaming finishes
@@ -204,6 +249,7 @@ export function usePortfolioStream(): UsePortfolioStreamReturn {
   return {
     state,
     loadingSection,
+    activeSections,
     streaming,
     finished,
     error,
@@ -0,0 +1,64 @@
+/**
+ * Client side of the backend "delta" stream format (see
+ * `backend/app/agent/patches.py`).
+ *
+ * Operations are addressed by RFC 6901 JSON pointers relative to the section
+ * data object:
+ * - `add`    – RFC 6902 add (`/-` appends to an array)
+ * - `append` – appends a string suffix to an existing string
+ */
+export interface PatchOp {
+  op: 'add' | 'append';
+  path: string;
+  value: unknown;
+}
+
+type Container = Record<string, unknown> | unknown[];
+
+function unescapeToken(token: string): string {
+  return token.replace(/~1/g, '/').replace(/~0/g, '~');
+}
+
+function cloneContainer(value: unknown): Container {
+  if (Array.isArray(value)) return [...value];
+  if (value && typeof value === 'object') return { ...(value as Record<string, unknown>) };
+  return {};
+}
+
+/**
+ * Apply `op` to `doc` without mutating it. Only the containers along the
+ * pointer path are copied so React sees a new reference where data changed.
+ */
+function applyOp(doc: unknown, op: PatchOp): unknown {
+  const tokens = op.path.split('/').slice(1).map(unescapeToken);
+  if (tokens.length === 0) {
+    return op.op === 'append' ? `${doc ?? ''}${op.value}` : op.value;
+  }
+  const root = cloneContainer(doc);
+  let node: Container = root;
+  for (const token of tokens.slice(0, -1)) {
+    const key = Array.isArray(node) ? Number(token) : token;
+    const child = cloneContainer((node as Record<string, unknown>)[key as string]);
+    (node as Record<string, unknown>)[key as string] = child;
+    node = child;
+  }
+  const last = tokens[tokens.length - 1];
+  if (Array.isArray(node)) {
+    if (last === '-') {
+      node.push(op.value);
+    } else if (op.op === 'append') {
+      node[Number(last)] = `${node[Number(last)] ?? ''}${op.value}`;
+    } else {
+      node.splice(Number(last), 0, op.value);
+    }
+  } else if (op.op === 'append') {
+    node[last] = `${node[last] ?? ''}${op.value}`;
+  } else {
+    node[last] = op.value;
+  }
+  return root;
+}
+
+export function applyPatch(doc: unknown, ops: PatchOp[]): unknown {
+  return ops.reduce(applyOp, doc);
+}